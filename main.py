@@ -1,20 +1,120 @@
 import argparse
-from src.pipeline import FinancialPipeline
+import sys
+
+# Heavy modules (pandas, the normalizers) are imported inside the commands that need them,
+# so --help starts instantly and compile-config never loads the pipeline
+
+def compile_config_command(args: argparse.Namespace) -> None:
+    '''
+    Build the precompiled merchant/keyword snapshot that later runs load instead of the config CSVs.
+    '''
+    from src.normalization.snapshot import compile_config, SNAPSHOT_FILE
+
+    path = compile_config(args.snapshot or SNAPSHOT_FILE)
+    print(f"Compiled config snapshot written to {path}")
+
+def run_command(args: argparse.Namespace) -> None:
+    '''
+    Run the FinancialPipeline with the provided input/output paths and options.
+    '''
+    from src.pipeline import FinancialPipeline, PipelineError
+
+    # Size limits left unset fall back to the pipeline's own defaults
+    limits = {"memo_size": args.memo_size, "merchant_cache_size": args.merchant_cache_size}
+
+    # Creates output directory and file during pipeline run if none exists
+    pipeline = FinancialPipeline(
+        input_path=args.input,
+        output_path=args.output,
+        decimal=args.decimal,
+        chunksize=args.chunksize,
+        workers=args.workers,
+        shard_bytes=args.shard_mb * 1024 * 1024 if args.shard_mb else None,
+        engine=args.engine,
+        project_columns=args.project_columns,
+        input_format=args.input_format,
+        output_format=args.output_format,
+        partition=args.partition,
+        incremental=args.incremental,
+        merchant_cache=args.merchant_cache,
+        pipelined=args.pipelined,
+        max_error_samples=args.max_error_samples,
+        **{key: value for key, value in limits.items() if value is not None}
+    )
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    try:
+        pipeline.run()
+    except PipelineError as e:
+        print(e)
+        sys.exit(1)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profile_path = pipeline.output_path.parent / "profile.prof"
+            profile_path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(str(profile_path))
+            print(f"cProfile stats saved to {profile_path} (inspect with python -m pstats)")
+
+def serve_command(args: argparse.Namespace) -> None:
+    '''
+    Keep config and caches warm in a long-running HTTP service that normalizes batches on request.
+    '''
+    from src.service import NormalizationService, serve
+
+    limits = {"memo_size": args.memo_size, "merchant_cache_size": args.merchant_cache_size}
+    service = NormalizationService(
+        decimal=args.decimal,
+        merchant_cache=args.merchant_cache,
+        **{key: value for key, value in limits.items() if value is not None}
+    )
+    serve(service, args.host, args.port)
+
+COMMANDS = {
+    "run": run_command,
+    "compile-config": compile_config_command,
+    "serve": serve_command,
+}
 
 def main() -> None:
     '''
-    CLI entrypoint: parse args and run the FinancialPipeline with provided input/output paths.
+    CLI entrypoint: parse args and dispatch to the requested command (run by default).
     '''
     parser = argparse.ArgumentParser()
 
-    parser.add_argument("--input", type=str, default="data/raw/generated_transactions.csv", help="Path to input CSV")
+    parser.add_argument("command", nargs="?", default="run", choices=list(COMMANDS), help="run the pipeline (default), compile-config, or serve")
+
+    parser.add_argument("--input", type=str, default="data/raw/generated_transactions.csv", help="Path to input CSV, or a directory / quoted glob of files to process as one batch")
     parser.add_argument("--output", type=str, default="data/processed/normalized_data.csv", help="Path to output CSV")
+    parser.add_argument("--decimal", type=str, default=".", choices=[".", ","], help="Decimal separator used in amounts (',' for European exports)")
+    parser.add_argument("--memo-size", type=int, default=None, help="Max distinct raw values remembered per column (0 disables the LRU; default 100000)")
+    parser.add_argument("--chunksize", type=int, default=None, help="Stream the input in chunks of this many rows to keep memory flat")
 
-    args = parser.parse_args()
+    parser.add_argument("--workers", type=int, default=1, help="Normalize in a pool of this many processes")
 
-    # Creates output directory and file during pipeline run if none exists
-    pipeline = FinancialPipeline(input_path=args.input, output_path=args.output)
-    pipeline.run()
+    parser.add_argument("--shard-mb", type=int, default=None, help="Memory-map the input and let each worker parse its own byte range of this many MB")
+
+    parser.add_argument("--engine", type=str, default="c", choices=["c", "pyarrow"], help="CSV parser used to load the input (pyarrow requires the pyarrow package)")
+    parser.add_argument("--input-format", type=str, default="csv", choices=["csv", "parquet", "arrow"], help="Input file format (.gz/.zst CSV is decompressed on the fly)")
+    parser.add_argument("--output-format", type=str, default="csv", choices=["csv", "parquet", "arrow"], help="Clean output format (.gz/.zst CSV is compressed on the fly)")
+    parser.add_argument("--partition", action="store_true", help="Write output as a Hive-style year=/month= directory tree rooted at --output")
+    parser.add_argument("--merchant-cache", type=str, default=None, help="SQLite file that remembers resolved merchants across runs")
+    parser.add_argument("--merchant-cache-size", type=int, default=None, help="Max merchants kept in the persistent cache, least recently used evicted first (default 1000000)")
+    parser.add_argument("--incremental", action="store_true", help="Only normalize rows appended since the last run (state kept next to the output)")
+    parser.add_argument("--max-error-samples", type=int, default=None, help="Log at most this many error rows per error type (the report still counts all)")
+    parser.add_argument("--pipelined", action="store_true", help="Read, normalize and write on separate threads joined by bounded queues")
+    parser.add_argument("--project-columns", action="store_true", help="Load only the mapped date/merchant/amount columns; error rows are re-read in full")
+    parser.add_argument("--profile", action="store_true", help="Write a cProfile dump of the run to profile.prof next to the report (main process only)")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="serve: interface to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="serve: HTTP port to listen on")
+    parser.add_argument("--snapshot", type=str, default=None, help="compile-config: where to write the snapshot (default data/config/compiled_config.pkl)")
+
+    args = parser.parse_args()
+    COMMANDS[args.command](args)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,108 @@
+import argparse
+import random
+import time
+from typing import List, Optional
+
+from faker import Faker
+from rapidfuzz import process, fuzz
+
+from src.normalization.merchants import NgramIndex, FUZZY_CUTOFF, clean_merchant_name
+
+SEED_VALUE = 42
+
+def build_vendor_master(num_names: int) -> List[str]:
+    '''
+    Synthesize a deduplicated vendor master of cleaned company names, seeded for repeatable runs.
+    '''
+    Faker.seed(SEED_VALUE)
+    fake = Faker()
+    names = {}
+    while len(names) < num_names:
+        name = clean_merchant_name(f"{fake.company()} {fake.city()}" if len(names) % 2 else fake.company())
+        names.setdefault(name, None)
+    return list(names)
+
+def build_queries(names: List[str], num_queries: int) -> List[str]:
+    '''
+    Noisy variants of known vendors (dropped/swapped tokens, store suffixes) plus some unknown names.
+    '''
+    rng = random.Random(SEED_VALUE)
+    fake = Faker()
+    queries = []
+    for _ in range(num_queries):
+        roll = rng.random()
+        tokens = rng.choice(names).split()
+        if roll < 0.4:
+            queries.append(" ".join(tokens + [f"#{rng.randint(1, 9999)}"]))
+        elif roll < 0.7 and len(tokens) > 1:
+            queries.append(" ".join(tokens[:-1]))
+        elif roll < 0.9:
+            rng.shuffle(tokens)
+            queries.append(" ".join(tokens))
+        else:
+            queries.append(clean_merchant_name(fake.catch_phrase()))
+    return queries
+
+def brute_force(queries: List[str], names: List[str]) -> List[Optional[str]]:
+    '''
+    Reference answer: score every query against every name.
+    '''
+    results = []
+    for query in queries:
+        match = process.extractOne(query, names, scorer=fuzz.token_set_ratio, score_cutoff=FUZZY_CUTOFF)
+        results.append(match[0] if match else None)
+    return results
+
+def indexed(queries: List[str], names: List[str], index: NgramIndex, limit: int) -> List[Optional[str]]:
+    '''
+    Score each query only against the index's top candidates.
+    '''
+    results = []
+    for query in queries:
+        choices = [names[i] for i in index.candidates(query, limit)]
+        match = process.extractOne(query, choices, scorer=fuzz.token_set_ratio, score_cutoff=FUZZY_CUTOFF)
+        results.append(match[0] if match else None)
+    return results
+
+def _score(query: str, match: Optional[str]) -> float:
+    '''
+    Score of a returned match, 0 when nothing cleared the cutoff.
+    '''
+    return fuzz.token_set_ratio(query, match) if match is not None else 0.0
+
+def main() -> None:
+    '''
+    Compare brute-force fuzzy matching against the n-gram index at several candidate limits.
+    '''
+    parser = argparse.ArgumentParser(description="Benchmark NgramIndex candidate pruning against a brute-force scan")
+    parser.add_argument("--names", type=int, default=100_000, help="Size of the synthetic vendor master")
+    parser.add_argument("--queries", type=int, default=500, help="Number of noisy lookups")
+    parser.add_argument("--limits", type=str, default="64,256,1024", help="Comma-separated candidate limits to try")
+    args = parser.parse_args()
+
+    names = build_vendor_master(args.names)
+    queries = build_queries(names, args.queries)
+
+    start = time.perf_counter()
+    index = NgramIndex(names)
+    print(f"Index build for {len(names):,} names: {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    expected = brute_force(queries, names)
+    brute_secs = time.perf_counter() - start
+    print(f"Brute force: {len(queries) / brute_secs:,.0f} queries/sec")
+
+    for limit in [int(value) for value in args.limits.split(",")]:
+        start = time.perf_counter()
+        actual = indexed(queries, names, index, limit)
+        secs = time.perf_counter() - start
+        agreement = sum(a == b for a, b in zip(actual, expected)) / len(queries)
+        # token_set_ratio scores many subset matches at 100, so a different name can be an equally good answer
+        score_agreement = sum(
+            _score(query, a) == _score(query, b) for query, a, b in zip(queries, actual, expected)
+        ) / len(queries)
+        print(f"Index limit {limit:>5}: {len(queries) / secs:,.0f} queries/sec ({brute_secs / secs:.1f}x), "
+              f"same match {agreement:.1%}, same best score {score_agreement:.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+SEED_VALUE = 42
+BENCH_DIR = Path("data/bench")
+MERCHANT_FILE = Path("data/config/canonical_merchants.csv")
+
+# Row counts accepted by --sizes, by label
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+# Rows generated and written per block, so a 10M-row file never sits in memory whole
+BLOCK_ROWS = 1_000_000
+
+# Stages faster than this in the baseline are too noisy to flag on their own
+MIN_STAGE_SECONDS = 0.05
+
+# Dirty rows are split between these kinds; the pipeline fails the first two and sends the third to dateutil
+DIRTY_KINDS = ["bad_date", "bad_amount", "slow_date"]
+
+def dataset_path(rows: int, merchants: int, dirty: float) -> Path:
+    '''
+    Cache location of one generated input, named by its parameters
+    '''
+    return BENCH_DIR / f"bench_{rows}_m{merchants}_d{int(dirty * 100)}.csv"
+
+def merchant_vocabulary(merchants: int, rng: np.random.Generator) -> np.ndarray:
+    '''
+    Distinct raw merchant strings: decorated canonical names (exact, ticker and fuzzy paths) and unknown vendors
+    '''
+    with open(MERCHANT_FILE, encoding="utf-8") as f:
+        canonical = [(row["canonical_name"], row["ticker"]) for row in csv.DictReader(f)]
+
+    decorations = ["{}", "{} *TRIP", "{} #{}", "{} INC", "WWW.{}.COM", "  {}  ", "{} STORE {}", "{}*{}"]
+    vocabulary = {}
+    index = 0
+    while len(vocabulary) < merchants:
+        name, ticker = canonical[index % len(canonical)]
+        roll = rng.random()
+        if roll < 0.1 and ticker:
+            raw = f"{ticker} {rng.integers(1, 9999)}"
+        elif roll < 0.7:
+            raw = decorations[rng.integers(len(decorations))].format(name, rng.integers(1, 9999))
+        else:
+            raw = f"VENDOR {index} {rng.choice(['CAFE', 'MARKET', 'REPAIR', 'SUPPLY', 'HOLDINGS', 'STUDIO'])}"
+        vocabulary.setdefault(raw, None)
+        index += 1
+    return np.array(list(vocabulary), dtype=object)
+
+def date_strings() -> np.ndarray:
+    '''
+    Every day of two years in the layouts bank exports use
+    '''
+    days = pd.date_range("2024-01-01", "2025-12-31", freq="D")
+    formats = ["%Y-%m-%d", "%m/%d/%y", "%b %d, %Y", "%d-%b-%Y", "%Y.%m.%d"]
+    return np.array([day.strftime(fmt) for day in days for fmt in formats], dtype=object)
+
+def amount_strings(rng: np.random.Generator, count: int = 200_000) -> np.ndarray:
+    '''
+    A pool of distinct amounts, each in one of the currency layouts the amount parser handles
+    '''
+    cents = rng.integers(100, 5_000_000, size=count)
+    layouts = ["${:.2f}", "${:,.2f}", "{:.2f} USD", "USD {:.2f}", "{:.2f}", "({:.2f})"]
+    choices = rng.integers(len(layouts), size=count)
+    return np.array([layouts[choice].format(value / 100) for choice, value in zip(choices, cents)], dtype=object)
+
+def generate_dataset(rows: int, merchants: int, dirty: float, path: Path) -> None:
+    '''
+    Write a seeded synthetic export: Zipf-skewed merchants over a vocabulary of the given size,
+    plus a dirty share of rows split evenly across DIRTY_KINDS
+    '''
+    rng = np.random.default_rng(SEED_VALUE)
+    vocabulary = merchant_vocabulary(merchants, rng)
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+    weights /= weights.sum()
+    dates = date_strings()
+    amounts = amount_strings(rng)
+    dirty_values = {
+        "bad_date": np.array(["Not a date", "2025/13/01", "", "31/31/2025"], dtype=object),
+        "bad_amount": np.array(["N/A", "Free", "", "1.2.3"], dtype=object),
+        "slow_date": np.array(["Sept. 3rd, 2024", "March 14th 2025", "2025-01-4 10:00 PM", "Feb ury 19th, 2024"], dtype=object),
+    }
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(path.name + ".tmp")
+    with open(temp_path, "w", encoding="utf-8", newline="") as f:
+        for start in range(0, rows, BLOCK_ROWS):
+            size = min(BLOCK_ROWS, rows - start)
+            block = pd.DataFrame({
+                "Transaction Date": dates[rng.integers(len(dates), size=size)],
+                "Description": vocabulary[rng.choice(len(vocabulary), size=size, p=weights)],
+                "Amount": amounts[rng.integers(len(amounts), size=size)],
+            })
+
+            kinds = rng.choice(len(DIRTY_KINDS), size=size)
+            is_dirty = rng.random(size) < dirty
+            for number, kind in enumerate(DIRTY_KINDS):
+                hit = is_dirty & (kinds == number)
+                column = "Amount" if kind == "bad_amount" else "Transaction Date"
+                block.loc[hit, column] = dirty_values[kind][rng.integers(len(dirty_values[kind]), size=int(hit.sum()))]
+
+            block.to_csv(f, header=start == 0, index=False)
+    os.replace(temp_path, path)
+
+def ensure_dataset(rows: int, merchants: int, dirty: float) -> Path:
+    '''
+    Generated input for these parameters, created on first use and reused afterwards
+    '''
+    path = dataset_path(rows, merchants, dirty)
+    if not path.exists():
+        print(f"Generating {path} ...")
+        generate_dataset(rows, merchants, dirty, path)
+    return path
+
+def run_pipeline_case(case: Dict) -> Dict:
+    '''
+    Child process: one FinancialPipeline.run over the case input; seconds exclude interpreter startup
+    '''
+    from src.pipeline import FinancialPipeline
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        pipeline = FinancialPipeline(input_path=case["input"], output_path=str(Path(output_dir) / "normalized.csv"),
+                                     chunksize=case["chunksize"], workers=case["workers"], verbose=False)
+        start = time.perf_counter()
+        pipeline.run()
+        seconds = time.perf_counter() - start
+        metrics = json.loads(pipeline.metrics_path.read_text())
+
+    stages = {name: {"seconds": stage["seconds"], "rows_per_sec": stage["rows_per_sec"]}
+              for name, stage in metrics["stages"].items()}
+    return {"rows": pipeline.stats["total_rows"], "seconds": seconds, "stages": stages}
+
+def run_function_case(case: Dict) -> Dict:
+    '''
+    Child process: one normalizer over a column of the case input, config loaded before timing
+    '''
+    from src.normalization.dates import parse_date, parse_date_series
+    from src.normalization.amounts import parse_amount, parse_amount_series
+    from src.normalization.merchants import parse_merchant, parse_merchant_series, load_merchant_db, load_noise_words
+    from src.normalization.categories import assign_category, assign_category_series, load_keywords
+
+    load_merchant_db()
+    load_noise_words()
+    load_keywords()
+
+    df = pd.read_csv(case["input"], dtype=str, nrows=case["rows"]).fillna("")
+    functions = {
+        "parse_date": ("Transaction Date", parse_date, parse_date_series),
+        "parse_amount": ("Amount", parse_amount, parse_amount_series),
+        "parse_merchant": ("Description", parse_merchant, parse_merchant_series),
+        # Categories are assigned to canonical merchants, so that is the column they are timed on
+        "assign_category": ("Description", assign_category, assign_category_series),
+    }
+    column, scalar, series = functions[case["function"]]
+    values = df[column]
+    if case["function"] == "assign_category":
+        values = parse_merchant_series(values)
+
+    start = time.perf_counter()
+    if case["mode"] == "series":
+        series(values)
+    else:
+        [scalar(value) for value in values]
+    return {"rows": len(values), "seconds": time.perf_counter() - start}
+
+def measure(case: Dict) -> Dict:
+    '''
+    Run a case in a fresh interpreter and add its throughput and peak RSS (from the child's own rusage)
+    '''
+    process = subprocess.Popen([sys.executable, "-m", "scripts.benchmark_suite", "--case", json.dumps(case)],
+                               stdout=subprocess.PIPE, text=True)
+    output = process.stdout.read()
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        raise RuntimeError(f"Benchmark case {case['name']} failed with exit code {process.returncode}")
+
+    result = json.loads(output.strip().splitlines()[-1])
+    result["rows_per_sec"] = round(result["rows"] / result["seconds"], 1)
+    # ru_maxrss is reported in kilobytes on Linux
+    result["peak_rss_mb"] = round(usage.ru_maxrss / 1024, 1)
+    return result
+
+def plan_cases(args: argparse.Namespace) -> List[Dict]:
+    '''
+    Pipeline runs for every size x merchant cardinality x dirty mix, plus per-normalizer runs per cardinality and mix
+    '''
+    cases = []
+    cardinalities = [int(value) for value in args.merchants.split(",")]
+    mixes = [float(value) for value in args.dirty.split(",")]
+
+    for label, merchants, dirty in itertools.product(args.sizes.split(","), cardinalities, mixes):
+        cases.append({
+            "name": f"pipeline/{label}/m{merchants}/d{int(dirty * 100)}",
+            "kind": "pipeline",
+            "dataset": [SIZES[label], merchants, dirty],
+            "chunksize": args.chunksize,
+            "workers": args.workers,
+        })
+
+    functions = ["parse_date", "parse_amount", "parse_merchant", "assign_category"]
+    for merchants, dirty, function in itertools.product(cardinalities, mixes, functions):
+        for mode, rows in [("series", args.function_rows), ("scalar", args.scalar_rows)]:
+            cases.append({
+                "name": f"{function}[{mode}]/m{merchants}/d{int(dirty * 100)}",
+                "kind": "function",
+                "dataset": [args.function_rows, merchants, dirty],
+                "function": function,
+                "mode": mode,
+                "rows": rows,
+            })
+    return cases
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    '''
+    Regressions against a baseline: rows/sec (per case and per pipeline stage) down, or peak RSS up,
+    by more than threshold (0.1 = 10%). Cases missing from either side are skipped.
+    '''
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+
+        if result["rows_per_sec"] < base["rows_per_sec"] * (1 - threshold):
+            regressions.append(f"{name}: {result['rows_per_sec']:,.0f} rows/sec vs baseline {base['rows_per_sec']:,.0f}")
+        if result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + threshold):
+            regressions.append(f"{name}: peak RSS {result['peak_rss_mb']:,.1f} MB vs baseline {base['peak_rss_mb']:,.1f}")
+
+        for stage, stats in result.get("stages", {}).items():
+            base_stage = base.get("stages", {}).get(stage)
+            if not base_stage or not base_stage["rows_per_sec"] or not stats["rows_per_sec"]:
+                continue
+            if base_stage["seconds"] < MIN_STAGE_SECONDS:
+                continue
+            if stats["rows_per_sec"] < base_stage["rows_per_sec"] * (1 - threshold):
+                regressions.append(f"{name} [{stage}]: {stats['rows_per_sec']:,.0f} rows/sec "
+                                   f"vs baseline {base_stage['rows_per_sec']:,.0f}")
+    return regressions
+
+def environment() -> Dict[str, str]:
+    '''
+    Where the numbers were taken, saved alongside them
+    '''
+    return {"python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+            "platform": platform.platform(), "cpus": str(os.cpu_count())}
+
+def main() -> None:
+    '''
+    Run the suite, save results as JSON and fail (exit 1) on regressions against a stored baseline.
+    '''
+    parser = argparse.ArgumentParser(description="Throughput and peak memory benchmarks for the normalizers and the pipeline")
+    parser.add_argument("--case", type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--sizes", type=str, default="10k,1m,10m", help=f"Pipeline input sizes ({', '.join(SIZES)})")
+    parser.add_argument("--merchants", type=str, default="100,100000", help="Comma-separated distinct merchant strings per input")
+    parser.add_argument("--dirty", type=str, default="0,0.1", help="Comma-separated shares of dirty rows")
+    parser.add_argument("--chunksize", type=int, default=500_000, help="Pipeline chunk size (keeps memory flat on large inputs)")
+    parser.add_argument("--workers", type=int, default=1, help="Pipeline worker processes")
+    parser.add_argument("--function-rows", type=int, default=100_000, help="Rows per column-level normalizer case")
+    parser.add_argument("--scalar-rows", type=int, default=10_000, help="Rows per scalar normalizer case")
+    parser.add_argument("--filter", type=str, default=None, help="Only run cases whose name contains this text")
+    parser.add_argument("--output", type=str, default=str(BENCH_DIR / "results.json"), help="Where to write results")
+    parser.add_argument("--baseline", type=str, default=None, help="Baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed slowdown / memory growth before failing (0.1 = 10%%)")
+    args = parser.parse_args()
+
+    if args.case:
+        case = json.loads(args.case)
+        result = run_pipeline_case(case) if case["kind"] == "pipeline" else run_function_case(case)
+        print(json.dumps(result))
+        return
+
+    results = {}
+    for case in plan_cases(args):
+        if args.filter and args.filter not in case["name"]:
+            continue
+        # Inputs are generated only for cases that actually run
+        case["input"] = str(ensure_dataset(*case.pop("dataset")))
+        result = measure(case)
+        results[case["name"]] = result
+        print(f"{case['name']:<40} {result['rows_per_sec']:>14,.0f} rows/sec {result['peak_rss_mb']:>9,.1f} MB peak RSS")
+
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+    print(f"Results saved to {output_path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
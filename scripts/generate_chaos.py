@@ -1,59 +1,145 @@
+import argparse
 import csv
 import random
-from faker import Faker
+import sys
 from datetime import date, timedelta
+from itertools import accumulate
+from multiprocessing import Pool
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+from faker import Faker
+
+# Run as python scripts/generate_chaos.py, only scripts/ is on the path; the repo root is needed for src
+REPO_ROOT = str(Path(__file__).resolve().parents[1])
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from src.formats import FORMATS, import_pyarrow, open_csv_sink
 
 SEED_VALUE = 42
 NUM_FAKE_ROWS = 70
 OUTPUT_FILE = Path('data/raw/generated_transactions.csv')
+MERCHANT_FILE = Path('data/config/canonical_merchants.csv')
+FIELDNAMES = ['Trans Date', 'Description', 'Value']
+
+# Rows generated (and held in memory) per block; each block has its own seed, so blocks can run in any process
+BLOCK_ROWS = 100_000
+
+# Block n is seeded with seed + n * SEED_STRIDE; block 0 keeps the plain seed, so the default file never changes
+SEED_STRIDE = 1_000_003
 
-random.seed(SEED_VALUE)
-Faker.seed(SEED_VALUE)
-fake = Faker()
+STATIC_MERCHANTS = ["STARBUCKS", "AMAZON *PRIME", "COSTCO WHSE", "SHELL OIL", "DIGITAL OCEAN INC", "LYFT RIDE"]
 
-def generate_faker_rows(num_rows) -> List[Dict[str,str]]:
+# Layouts selectable by --date-formats / --amount-formats, in the order the original generator drew them
+DATE_FORMATS = {"iso": "%Y-%m-%d", "us": "%m/%d/%y", "long": "%b %d, %Y", "dmy": "%d-%b-%Y", "dot": "%Y.%m.%d"}
+AMOUNT_FORMATS = {
+    "dollar": "${basic}", "comma": "${comma}", "spaced": "$ {basic}", "suffix": "{basic} USD",
+    "prefix": "USD {basic}", "plain": "{basic}", "whole": "{whole}",
+}
+
+# Values an error row gets in one of its fields; every one of them fails validation in the pipeline
+ERROR_VALUES = {
+    'Trans Date': ["Not a date", "2025/13/01", "", "31/31/2025"],
+    'Value': ["N/A", "Free", "", "1.2.3"],
+}
+
+def parse_weights(spec: Optional[str], choices: Dict[str, str]) -> Optional[List[float]]:
+    '''
+    Cumulative weights for "name=weight,..." over the given layouts (unlisted ones get 0); None keeps a uniform draw
+    '''
+    if not spec:
+        return None
+    weights = dict.fromkeys(choices, 0.0)
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in choices:
+            raise ValueError(f"Unknown format {name!r}; choose from {', '.join(choices)}")
+        weights[name] = float(weight or 1)
+    if sum(weights.values()) <= 0:
+        raise ValueError(f"Format weights must add up to more than 0: {spec!r}")
+    return list(accumulate(weights.values()))
+
+def build_vocabulary(merchants: Optional[int]) -> List[str]:
+    '''
+    Known merchant names to draw from: the six static ones by default, otherwise that many distinct names
+    made of the static ones, the canonical merchants and numbered store variants of both
+    '''
+    if merchants is None:
+        return STATIC_MERCHANTS
+    with open(MERCHANT_FILE, encoding='utf-8') as f:
+        canonical = [row['canonical_name'] for row in csv.DictReader(f)]
+
+    bases = list(dict.fromkeys(STATIC_MERCHANTS + canonical))
+    vocabulary = bases[:merchants]
+    store = 1
+    while len(vocabulary) < merchants:
+        vocabulary.extend(f"{name} #{store}" for name in bases[:merchants - len(vocabulary)])
+        store += 1
+    return vocabulary
+
+def zipf_weights(size: int, skew: float) -> Optional[List[float]]:
+    '''
+    Cumulative Zipf-like weights (rank ** -skew) for a vocabulary; None for skew 0, which keeps a uniform draw
+    '''
+    if not skew:
+        return None
+    return list(accumulate(rank ** -skew for rank in range(1, size + 1)))
+
+def pick(rng: random.Random, values: List[str], cum_weights: Optional[List[float]]) -> str:
+    '''
+    One value, uniformly (as random.choice) or by cumulative weights
+    '''
+    if cum_weights is None:
+        return rng.choice(values)
+    return rng.choices(values, cum_weights=cum_weights)[0]
+
+def generate_faker_rows(num_rows: int, seed: int = SEED_VALUE, options: Optional[Dict] = None) -> List[Dict[str,str]]:
     '''
     Create a randomized but seeded set of intentionally inconsistent transactions.
+    options carries the vocabulary, weights and rates from default_options(); without it the defaults are used.
     '''
+    options = options or default_options()
+    rng = random.Random(seed)
+    fake = Faker()
+    fake.seed_instance(seed)
+
+    vocabulary = options["vocabulary"]
+    merchant_weights = options["merchant_weights"]
+    date_formats = list(DATE_FORMATS.values())
+    amount_formats = list(AMOUNT_FORMATS.values())
     rows = []
-    static_merchants = ["STARBUCKS", "AMAZON *PRIME", "COSTCO WHSE", "SHELL OIL", "DIGITAL OCEAN INC", "LYFT RIDE"]
 
     for i in range(num_rows):
         # Anchor around a known date to keep test data deterministic
-        txn_date = date(2025, 12, 6) - timedelta(days=random.randint(1, 365))
-        date_format = random.choice([txn_date.strftime("%Y-%m-%d"), 
-                                     txn_date.strftime("%m/%d/%y"), 
-                                     txn_date.strftime("%b %d, %Y"), 
-                                     txn_date.strftime("%d-%b-%Y"), 
-                                     txn_date.strftime("%Y.%m.%d")])
-
-        amount = round(random.uniform(5.0, 500.0), 2)
-
-        comma_fmt = f"{amount:,.2f}"
-        basic_fmt = f"{amount:.2f}"
-        amount_str = random.choice([f"${basic_fmt}", 
-                                    f"${comma_fmt}", 
-                                    f"$ {basic_fmt}",
-                                    f"{basic_fmt} USD",
-                                    f"USD {amount:.2f}", 
-                                    f"{basic_fmt}",
-                                    f"{amount:.0f}"])
-        
-        if random.random() < 0.9:
-            merchant_name = random.choice(static_merchants)
+        txn_date = date(2025, 12, 6) - timedelta(days=rng.randint(1, 365))
+        date_format = txn_date.strftime(pick(rng, date_formats, options["date_weights"]))
+
+        amount = round(rng.uniform(5.0, 500.0), 2)
+        amount_str = pick(rng, amount_formats, options["amount_weights"]).format(
+            basic=f"{amount:.2f}", comma=f"{amount:,.2f}", whole=f"{amount:.0f}")
+
+        if rng.random() < options["known_rate"]:
+            merchant_name = pick(rng, vocabulary, merchant_weights)
         else:
             merchant_name = fake.company()
-        
-        if random.random() < 0.2:
+
+        if rng.random() < 0.2:
             merchant_name = f"{merchant_name.replace(' ', '*')}"
-        if random.random() < 0.1:
+        if rng.random() < 0.1:
             merchant_name = f"**{merchant_name.upper()}**"
-        if random.random() < 0.1:
+        if rng.random() < 0.1:
             merchant_name = f" {merchant_name} "
 
-        rows.append({'Trans Date': date_format, 'Description': merchant_name, 'Value': amount_str})
+        row = {'Trans Date': date_format, 'Description': merchant_name, 'Value': amount_str}
+
+        # Only drawn when asked for, so the default stream of random numbers is the original one
+        if options["error_rate"] and rng.random() < options["error_rate"]:
+            field = rng.choice(list(ERROR_VALUES))
+            row[field] = rng.choice(ERROR_VALUES[field])
+
+        rows.append(row)
 
     return rows
 
@@ -64,13 +150,13 @@ def get_edge_cases() -> List[Dict[str,str]]:
     return[
         # Dates
         {'Trans Date': 'Sept. 3rd, 2024', 'Description': 'Google Play Store', 'Value': '$12.99'},
-        {'Trans Date': '01/01/2023 11:59 PM', 'Description': 'Late Night Pizza', 'Value': '$35.00'}, 
+        {'Trans Date': '01/01/2023 11:59 PM', 'Description': 'Late Night Pizza', 'Value': '$35.00'},
         {'Trans Date': '2025-01-4', 'Description': 'Gym Membership', 'Value': '1000'},
         {'Trans Date': '2025/13/01', 'Description': 'Amazon', 'Value': '$1.00'}, # Invalid date
 
         # Amounts
-        {'Trans Date': '2025-01-02', 'Description': 'ATM Withdrawal', 'Value': '(500.00)'}, 
-        {'Trans Date': '2025-01-02', 'Description': 'Chase ATM', 'Value': '-500.00'}, 
+        {'Trans Date': '2025-01-02', 'Description': 'ATM Withdrawal', 'Value': '(500.00)'},
+        {'Trans Date': '2025-01-02', 'Description': 'Chase ATM', 'Value': '-500.00'},
         {'Trans Date': '2025-01-03', 'Description': 'Bonus Deposit', 'Value': '1,500.00 USD'},
         {'Trans Date': '2025-01-04', 'Description': 'Bank Adjustment', 'Value': '0'},
 
@@ -83,7 +169,7 @@ def get_edge_cases() -> List[Dict[str,str]]:
         {'Trans Date': '2025-01-08', 'Description': 'Starbucks ☕️', 'Value': '$5.00'},
         {'Trans Date': '2025-01-09', 'Description': '        Target Store    ', 'Value': '$10.00'},
         {'Trans Date': '2025-01-09', 'Description': 'Unknown Vendor', 'Value': '$10.00'}, # Should be unrecognized vendor
-        
+
 
         # Missing Data
         {'Trans Date': '', 'Description': 'walmart', 'Value': '$10.00'}, # Missing Date
@@ -91,22 +177,153 @@ def get_edge_cases() -> List[Dict[str,str]]:
         {'Trans Date': '2025/12/10', 'Description': 'Christmas Shopping', 'Value': ''}, # Missing Value
     ]
 
-def create_chaos_file() -> None:
+def default_options(merchants: Optional[int] = None, skew: float = 0.0, date_formats: Optional[str] = None,
+                    amount_formats: Optional[str] = None, error_rate: float = 0.0, known_rate: float = 0.9) -> Dict:
+    '''
+    Everything a block needs besides its seed and size, built once and shipped to every worker
+    '''
+    vocabulary = build_vocabulary(merchants)
+    return {
+        "vocabulary": vocabulary,
+        "merchant_weights": zipf_weights(len(vocabulary), skew),
+        "date_weights": parse_weights(date_formats, DATE_FORMATS),
+        "amount_weights": parse_weights(amount_formats, AMOUNT_FORMATS),
+        "error_rate": error_rate,
+        "known_rate": known_rate,
+    }
+
+def _generate_block(task: tuple) -> List[Dict[str,str]]:
+    '''
+    Pool entry point: one block's rows from (rows, seed, options)
+    '''
+    return generate_faker_rows(*task)
+
+class RowWriter:
+    '''
+    Streams raw row blocks to CSV (gzip/zstd by suffix) or to one Parquet/Arrow file, all columns as text
+    '''
+
+    def __init__(self, path: Path, fmt: str) -> None:
+        self.path = Path(path)
+        self.fmt = fmt
+        self._handle = None
+        self._writer = None
+
+    def write(self, rows: List[Dict[str,str]]) -> None:
+        '''
+        Append one block, opening the output on first use
+        '''
+        if self.fmt == "csv":
+            if self._handle is None:
+                self._handle = open_csv_sink(self.path)
+                self._writer = csv.DictWriter(self._handle, fieldnames=FIELDNAMES)
+                self._writer.writeheader()
+            self._writer.writerows(rows)
+            return
+
+        pa = import_pyarrow()
+        schema = pa.schema([(name, pa.string()) for name in FIELDNAMES])
+        table = pa.Table.from_pylist(rows, schema=schema)
+        if self._writer is None:
+            if self.fmt == "parquet":
+                self._writer = pa.parquet.ParquetWriter(str(self.path), schema)
+            else:
+                self._writer = pa.ipc.new_file(str(self.path), schema)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        '''
+        Flush and close the output
+        '''
+        if self._handle is not None:
+            self._handle.close()
+        elif self._writer is not None:
+            self._writer.close()
+
+def generate_blocks(num_rows: int, seed: int, options: Dict, block_rows: int = BLOCK_ROWS, workers: int = 1):
+    '''
+    Yield the rows in blocks of block_rows, in order. With several workers, one window of blocks is
+    generated in parallel at a time, so memory stays bounded and the output matches a single-process run.
+    '''
+    tasks = [(min(block_rows, num_rows - start), seed + number * SEED_STRIDE, options)
+             for number, start in enumerate(range(0, num_rows, block_rows))]
+    if workers <= 1:
+        for task in tasks:
+            yield _generate_block(task)
+        return
+
+    with Pool(workers) as pool:
+        for start in range(0, len(tasks), workers):
+            yield from pool.map(_generate_block, tasks[start:start + workers])
+
+def output_format(path: Path, fmt: Optional[str]) -> str:
+    '''
+    The explicit format, or the one implied by the suffix (.parquet / .arrow, anything else is CSV)
+    '''
+    if fmt:
+        return fmt
+    suffix = Path(path).suffix.lower().lstrip(".")
+    return suffix if suffix in FORMATS else "csv"
+
+def create_chaos_file(output: Path = OUTPUT_FILE, num_rows: int = NUM_FAKE_ROWS, seed: int = SEED_VALUE,
+                      options: Optional[Dict] = None, edge_cases: bool = True, fmt: Optional[str] = None,
+                      block_rows: int = BLOCK_ROWS, workers: int = 1) -> None:
     '''
     Write the combined synthetic dataset to the raw data folder.
+    Rows are streamed block by block; the same arguments always produce the same file, whatever the worker count.
+    '''
+    options = options or default_options()
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    total = num_rows + (len(get_edge_cases()) if edge_cases else 0)
+
+    print(f"Generating {total} transactions...")
+    writer = RowWriter(output, output_format(output, fmt))
+    try:
+        for rows in generate_blocks(num_rows, seed, options, block_rows, workers):
+            writer.write(rows)
+        if edge_cases:
+            writer.write(get_edge_cases())
+    finally:
+        writer.close()
+    print(f"Successfully generated data at {output}")
+
+def main() -> None:
+    '''
+    Parse the CLI options and generate the file; with no options this rewrites the test fixture unchanged.
     '''
-    all_rows = generate_faker_rows(NUM_FAKE_ROWS) + get_edge_cases()
+    parser = argparse.ArgumentParser(description="Seeded generator of messy bank-export transactions")
+    parser.add_argument("--rows", type=int, default=NUM_FAKE_ROWS, help="Generated rows, before the edge cases")
+    parser.add_argument("--output", type=Path, default=OUTPUT_FILE, help="Output file (.csv, .csv.gz, .csv.zst, .parquet, .arrow)")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="Output format (default: from the suffix)")
+    parser.add_argument("--seed", type=int, default=SEED_VALUE, help="Seed; the same seed always gives the same file")
+    parser.add_argument("--merchants", type=int, default=None, help="Distinct known merchants (default: the six static ones)")
+    parser.add_argument("--skew", type=float, default=0.0, help="Zipf exponent for merchant popularity (0 = uniform)")
+    parser.add_argument("--unknown-rate", type=float, default=0.1, help="Share of rows with a random Faker company")
+    parser.add_argument("--date-formats", type=str, default=None, help=f"Weights, e.g. iso=3,us=1 (from {', '.join(DATE_FORMATS)})")
+    parser.add_argument("--amount-formats", type=str, default=None, help=f"Weights, e.g. dollar=2,plain=1 (from {', '.join(AMOUNT_FORMATS)})")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of rows with an invalid date or amount")
+    parser.add_argument("--no-edge-cases", action="store_true", help="Leave out the hard-coded edge rows")
+    parser.add_argument("--block-rows", type=int, default=BLOCK_ROWS, help="Rows generated and written per block")
+    parser.add_argument("--workers", type=int, default=1, help="Processes generating blocks in parallel")
+    args = parser.parse_args()
 
-    OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
+    if args.rows < 0 or args.block_rows < 1 or args.workers < 1:
+        parser.error("--rows must be >= 0, --block-rows and --workers >= 1")
+    if args.merchants is not None and args.merchants < 1:
+        parser.error("--merchants must be >= 1")
+    for name in ("unknown_rate", "error_rate"):
+        if not 0 <= getattr(args, name) <= 1:
+            parser.error(f"--{name.replace('_', '-')} must be between 0 and 1")
 
-    fieldnames = ['Trans Date', 'Description', 'Value']
+    try:
+        options = default_options(args.merchants, args.skew, args.date_formats, args.amount_formats,
+                                  args.error_rate, 1 - args.unknown_rate)
+    except ValueError as e:
+        parser.error(str(e))
 
-    print(f"Generating {len(all_rows)} transactions...")
-    with open(OUTPUT_FILE, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(all_rows)
-    print(f"Successfully generated data at {OUTPUT_FILE}")
+    create_chaos_file(args.output, args.rows, args.seed, options, not args.no_edge_cases, args.format,
+                      args.block_rows, args.workers)
 
 if __name__ == "__main__":
-    create_chaos_file()
\ No newline at end of file
+    main()
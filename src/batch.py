@@ -0,0 +1,40 @@
+import glob
+from pathlib import Path
+from typing import Dict, List
+
+# File suffixes picked up from a directory for each input format (compressed CSV included)
+FORMAT_SUFFIXES: Dict[str, tuple] = {
+    "csv": (".csv", ".csv.gz", ".csv.zst", ".csv.zstd"),
+    "parquet": (".parquet",),
+    "arrow": (".arrow",),
+}
+
+# Threads reading (and parsing) input files while earlier files are being normalized
+READ_THREADS = 4
+
+# Consecutive files with the same column mapping are normalized together in frames of up to this many rows
+BATCH_CHUNK_ROWS = 100_000
+
+def is_batch_input(path: str) -> bool:
+    '''
+    True when the input names many files: a directory or a glob pattern. An existing file is always a single
+    input, even when its name holds glob characters such as stmt[1].csv
+    '''
+    if Path(path).is_file():
+        return False
+    return glob.has_magic(str(path)) or Path(path).is_dir()
+
+def expand_inputs(path: str, input_format: str = "csv") -> List[Path]:
+    '''
+    Input files of a batch, sorted so output order is stable: every file of the input format directly in a
+    directory, or every file a glob (recursive ** allowed) matches
+    '''
+    if Path(path).is_dir():
+        suffixes = FORMAT_SUFFIXES[input_format]
+        files = [file for file in Path(path).iterdir() if file.is_file() and file.name.lower().endswith(suffixes)]
+    else:
+        files = [Path(match) for match in glob.glob(str(path), recursive=True) if Path(match).is_file()]
+
+    if not files:
+        raise FileNotFoundError(f"Error: No input files match {path}")
+    return sorted(files)
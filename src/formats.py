@@ -0,0 +1,284 @@
+import gzip
+import io
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+FORMATS = ("csv", "parquet", "arrow")
+
+# File extensions written for each format when output is split into Hive partitions
+PARTITION_EXTENSIONS = {"csv": "csv", "parquet": "parquet", "arrow": "arrow"}
+
+# Compressed CSV is recognized by suffix; gzip uses the standard library, zstd uses pyarrow's codec
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".zst": "zstd", ".zstd": "zstd"}
+
+# Extra clean-output column naming the input file of each row in multi-file batches
+SOURCE_COLUMN = "Source_File"
+
+def import_pyarrow():
+    '''
+    Import pyarrow on first use so plain CSV runs never need it installed
+    '''
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        import pyarrow.ipc
+        import pyarrow.compute
+    except ImportError as e:
+        raise ImportError("Parquet/Arrow formats and zstd compression require pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+def csv_compression(path: Path) -> Optional[str]:
+    '''
+    Compression codec implied by a CSV path's suffix, or None for plain text
+    '''
+    return COMPRESSION_SUFFIXES.get(Path(path).suffix.lower())
+
+@contextmanager
+def open_csv_source(path: Path):
+    '''
+    Source to hand to pd.read_csv: the path itself (pandas streams gzip), or a decompressing stream for zstd
+    '''
+    if csv_compression(path) != "zstd":
+        yield path
+        return
+    pa = import_pyarrow()
+    with pa.CompressedInputStream(pa.OSFile(str(path)), "zstd") as stream:
+        yield stream
+
+def open_csv_sink(path: Path, append: bool = False) -> io.TextIOBase:
+    '''
+    Text handle for writing CSV, compressing on the fly when the suffix asks for it.
+    Appending to a compressed file adds a new gzip member / zstd frame, which readers decode as one stream.
+    '''
+    codec = csv_compression(path)
+    if codec == "gzip":
+        return gzip.open(path, "at" if append else "wt", encoding="utf-8", newline="")
+    if codec == "zstd":
+        pa = import_pyarrow()
+        raw = pa.OSFile(str(path), "ab" if append else "wb")
+        return io.TextIOWrapper(pa.CompressedOutputStream(raw, "zstd"), encoding="utf-8", newline="")
+    return open(path, "a" if append else "w", encoding="utf-8", newline="")
+
+def read_columns(path: Path, fmt: str) -> List[str]:
+    '''
+    Column names of a Parquet or Arrow IPC file, read from the schema alone
+    '''
+    pa = import_pyarrow()
+    if fmt == "parquet":
+        return pa.parquet.read_schema(str(path)).names
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).schema.names
+
+def _to_string_frame(table, start: int) -> pd.DataFrame:
+    '''
+    Cast every column to text (as read_csv with dtype=str would see it) and number rows from start
+    '''
+    pa = import_pyarrow()
+    columns = {}
+    for name, column in zip(table.column_names, table.columns):
+        if not pa.types.is_string(column.type):
+            column = pa.compute.cast(column, pa.string())
+        columns[name] = column
+
+    df = pa.table(columns).to_pandas()
+    df.index = pd.RangeIndex(start, start + len(df))
+    return df.astype(str).fillna("")
+
+def iter_frames(path: Path, fmt: str, batch_size: Optional[int], usecols: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    '''
+    Yield a Parquet or Arrow IPC file as string frames of at most batch_size rows (one frame when None).
+    Arrow files are memory-mapped, so only the rows of the current frame are materialized.
+    '''
+    pa = import_pyarrow()
+
+    if fmt == "parquet":
+        parquet_file = pa.parquet.ParquetFile(str(path))
+        if batch_size is None:
+            yield _to_string_frame(parquet_file.read(columns=usecols), 0)
+            return
+        start = 0
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=usecols):
+            yield _to_string_frame(pa.Table.from_batches([batch]), start)
+            start += batch.num_rows
+        return
+
+    with pa.memory_map(str(path)) as source:
+        table = pa.ipc.open_file(source).read_all()
+        if usecols is not None:
+            table = table.select(usecols)
+        step = batch_size or max(table.num_rows, 1)
+        for start in range(0, max(table.num_rows, 1), step):
+            yield _to_string_frame(table.slice(start, step), start)
+
+def render_csv_frame(clean_df: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Render typed clean rows in the text schema: ISO date strings and amounts in currency units (plus Source_File in batches)
+    '''
+    rendered = pd.DataFrame({
+        "Date": np.datetime_as_string(clean_df["Date"].to_numpy().astype("datetime64[D]"), unit="D"),
+        "Merchant": clean_df["Merchant"].astype(object),
+        "Amount": clean_df["Amount"] / 100,
+        "Category": clean_df["Category"].astype(object),
+    }, index=clean_df.index)
+    if SOURCE_COLUMN in clean_df.columns:
+        rendered[SOURCE_COLUMN] = clean_df[SOURCE_COLUMN].astype(object)
+    return rendered
+
+class CsvWriter:
+    '''
+    Appends clean chunks to one (optionally compressed) CSV stream; the header goes out with the first chunk
+    unless the writer continues an existing file
+    '''
+
+    def __init__(self, path: Path, append: bool = False) -> None:
+        self.path = Path(path)
+        self.append = append
+        self._handle = None
+
+    def write(self, clean_df: pd.DataFrame) -> None:
+        '''
+        Render and append one typed chunk, opening the stream on first use
+        '''
+        header = self._handle is None and not self.append
+        if self._handle is None:
+            self._handle = open_csv_sink(self.path, self.append)
+        render_csv_frame(clean_df).to_csv(self._handle, header=header, index=False)
+
+    def close(self) -> None:
+        '''
+        Flush and close the stream (and its compressor)
+        '''
+        if self._handle is not None:
+            self._handle.close()
+
+class ArrowWriter:
+    '''
+    Writes clean chunks as Parquet or Arrow IPC: date32 Date, decimal128(18, 2) Amount, dictionary-encoded text.
+    Dictionaries only ever grow, so IPC files carry deltas instead of a new dictionary per chunk.
+    source_file adds a dictionary-encoded Source_File column for multi-file batches.
+    '''
+
+    def __init__(self, path: Path, fmt: str, source_file: bool = False) -> None:
+        pa = import_pyarrow()
+        self.path = Path(path)
+        self.fmt = fmt
+        text = pa.dictionary(pa.int32(), pa.string())
+        fields = [
+            ("Date", pa.date32()),
+            ("Merchant", text),
+            ("Amount", pa.decimal128(18, 2)),
+            ("Category", text),
+        ]
+        if source_file:
+            fields.append((SOURCE_COLUMN, text))
+        self.schema = pa.schema(fields)
+        self._dictionaries: Dict[str, Dict[str, int]] = {name: {} for name, kind in fields if kind == text}
+        self._writer = None
+
+    def _dictionary_column(self, name: str, values: pd.Series):
+        '''
+        Re-code a categorical column against this file's running dictionary
+        '''
+        pa = import_pyarrow()
+        ids = self._dictionaries[name]
+        for category in values.cat.categories:
+            ids.setdefault(category, len(ids))
+
+        remap = np.array([ids[category] for category in values.cat.categories], dtype=np.int32)
+        indices = remap[values.cat.codes.to_numpy()] if len(values) else np.empty(0, dtype=np.int32)
+        return pa.DictionaryArray.from_arrays(pa.array(indices, pa.int32()), pa.array(list(ids), pa.string()))
+
+    def _amount_column(self, cents: pd.Series):
+        '''
+        decimal128 straight from int64 cents: each value is a little-endian 128-bit integer scaled by 10^2
+        '''
+        pa = import_pyarrow()
+        low = cents.to_numpy(dtype=np.int64)
+        words = np.stack([low, np.where(low < 0, -1, 0)], axis=1).astype(np.int64)
+        return pa.Array.from_buffers(pa.decimal128(18, 2), len(low), [None, pa.py_buffer(words.tobytes())])
+
+    def write(self, clean_df: pd.DataFrame) -> None:
+        '''
+        Convert one typed chunk to a record batch and append it, opening the file on first use
+        '''
+        pa = import_pyarrow()
+        if self._writer is None:
+            if self.fmt == "parquet":
+                self._writer = pa.parquet.ParquetWriter(str(self.path), self.schema)
+            else:
+                options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+                self._writer = pa.ipc.new_file(str(self.path), self.schema, options=options)
+
+        columns = [
+            pa.array(clean_df["Date"].to_numpy().astype("datetime64[D]"), pa.date32()),
+            self._dictionary_column("Merchant", clean_df["Merchant"]),
+            self._amount_column(clean_df["Amount"]),
+            self._dictionary_column("Category", clean_df["Category"]),
+        ]
+        if SOURCE_COLUMN in self._dictionaries:
+            columns.append(self._dictionary_column(SOURCE_COLUMN, clean_df[SOURCE_COLUMN]))
+        batch = pa.record_batch(columns, schema=self.schema)
+
+        if self.fmt == "parquet":
+            self._writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            self._writer.write_batch(batch)
+
+    def close(self) -> None:
+        '''
+        Write the file footer
+        '''
+        if self._writer is not None:
+            self._writer.close()
+
+class PartitionedWriter:
+    '''
+    Hive-style layout under a root directory: year=YYYY/month=M/part-NNNNN.<ext>, one part per chunk and partition.
+    Partitions left by an earlier run are removed up front, so the dataset holds only this run's rows.
+    '''
+
+    def __init__(self, root: Path, fmt: str, source_file: bool = False) -> None:
+        self.root = Path(root)
+        self.fmt = fmt
+        self.source_file = source_file
+        self._parts = 0
+        # Only the year= trees this writer owns; anything else kept under the root is left alone
+        for stale in self.root.glob("year=*"):
+            if stale.is_dir():
+                shutil.rmtree(stale)
+
+    def write(self, clean_df: pd.DataFrame) -> None:
+        '''
+        Split one typed chunk by year and month of Date and write each piece as its own part file
+        '''
+        dates = clean_df["Date"].dt
+        for (year, month), rows in clean_df.groupby([dates.year, dates.month], sort=True):
+            directory = self.root / f"year={year}" / f"month={month}"
+            directory.mkdir(parents=True, exist_ok=True)
+            writer = make_writer(directory / f"part-{self._parts:05d}.{PARTITION_EXTENSIONS[self.fmt]}", self.fmt,
+                                 source_file=self.source_file)
+            writer.write(rows)
+            writer.close()
+        self._parts += 1
+
+    def close(self) -> None:
+        '''
+        Part files are closed as they are written
+        '''
+
+def make_writer(path: Path, fmt: str, partition: bool = False, append: bool = False, source_file: bool = False):
+    '''
+    Writer for clean output in the given format; partition=True treats path as the root of a Hive layout.
+    append (CSV only) continues an existing file without repeating the header.
+    source_file adds the Source_File column that multi-file batches attach to every row (CSV picks it up as is).
+    '''
+    if partition:
+        return PartitionedWriter(path, fmt, source_file)
+    if fmt == "csv":
+        return CsvWriter(path, append)
+    return ArrowWriter(path, fmt, source_file)
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import os
+import warnings
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+# Bytes hashed at each end of the processed prefix; appends leave both untouched, rewrites almost never do
+FINGERPRINT_BYTES = 64 * 1024
+
+STATE_VERSION = 1
+
+def range_digest(path: Path, start: int, end: int) -> str:
+    '''
+    SHA-256 of the byte range [start, end) of a file
+    '''
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(remaining, 1 << 20))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+def input_fingerprint(path: Path, offset: int) -> Dict[str, str]:
+    '''
+    Hashes of the first and last FINGERPRINT_BYTES of the already-processed prefix [0, offset)
+    '''
+    return {
+        "head": range_digest(path, 0, min(offset, FINGERPRINT_BYTES)),
+        "tail": range_digest(path, max(offset - FINGERPRINT_BYTES, 0), offset),
+    }
+
+def config_fingerprint(config_files: Iterable[Path], options: Dict) -> str:
+    '''
+    One hash over the contents of the normalization config files plus the options that change results
+    '''
+    digest = hashlib.sha256(json.dumps(options, sort_keys=True).encode('utf-8'))
+    for path in config_files:
+        path = Path(path)
+        digest.update(str(path.name).encode('utf-8'))
+        digest.update(path.read_bytes() if path.exists() else b'<missing>')
+    return digest.hexdigest()
+
+def load_state(path: Path) -> Optional[Dict]:
+    '''
+    Previously saved state, or None when there is none or it cannot be used
+    '''
+    if not path.exists():
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        warnings.warn(f"Ignoring unreadable state file {path}: {e}")
+        return None
+    return state if state.get("version") == STATE_VERSION else None
+
+def save_state(path: Path, state: Dict) -> None:
+    '''
+    Write state atomically so an interrupted run never leaves a half-written file behind
+    '''
+    temp_path = path.with_name(path.name + ".tmp")
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(state, version=STATE_VERSION), f, indent=2)
+    os.replace(temp_path, path)
@@ -0,0 +1,176 @@
+import sqlite3
+import time
+import warnings
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from src.incremental import config_fingerprint
+from src.normalization import merchants, categories
+from src.normalization.merchants import parse_merchant_series
+from src.normalization.categories import assign_category_series
+
+DEFAULT_MAX_ENTRIES = 1_000_000
+
+# Stays under SQLite's historical 999 bound-parameter limit per statement
+QUERY_BATCH_SIZE = 900
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS merchants (
+    raw TEXT PRIMARY KEY,
+    merchant TEXT NOT NULL,
+    category TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS merchants_last_used ON merchants (last_used);
+'''
+
+def merchant_config_hash() -> str:
+    '''
+    Hash of every input that decides a raw merchant's canonical name and category
+    '''
+    config_files = [merchants.MERCHANT_FILE, merchants.NOISE_FILE, categories.KEYWORDS_FILE]
+    options = {"fuzzy_cutoff": merchants.FUZZY_CUTOFF, "index_candidates": merchants.FUZZY_INDEX_CANDIDATES}
+    return config_fingerprint(config_files, options)
+
+class MerchantCache:
+    '''
+    SQLite-backed raw merchant → (canonical name, category) cache shared across runs (and worker processes).
+    Entries are dropped wholesale when the merchant, noise-word or keyword config changes, and least recently
+    used entries are evicted beyond max_entries.
+    '''
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Workers open their own connections; WAL lets them read while another process writes.
+        # The service shares one connection across request threads, serializing access itself.
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self.check_config()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM merchants").fetchone()[0]
+
+    def check_config(self) -> None:
+        '''
+        Clear every entry if the cache was filled under a different config
+        '''
+        config_hash = merchant_config_hash()
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'config_hash'").fetchone()
+        if row is not None and row[0] == config_hash:
+            return
+
+        if row is not None:
+            warnings.warn(f"Merchant config changed; clearing merchant cache at {self.path}")
+        with self._conn:
+            self._conn.execute("DELETE FROM merchants")
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('config_hash', ?)", (config_hash,))
+
+    def lookup(self, raw_values: List[str]) -> Dict[str, Tuple[str, str]]:
+        '''
+        Cached (merchant, category) for whichever raw values are present, refreshing their last-used time
+        '''
+        found = {}
+        now = time.time()
+        with self._conn:
+            for start in range(0, len(raw_values), QUERY_BATCH_SIZE):
+                batch = raw_values[start:start + QUERY_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT raw, merchant, category FROM merchants WHERE raw IN ({placeholders})", batch
+                ).fetchall()
+                found.update((raw, (merchant, category)) for raw, merchant, category in rows)
+                if rows:
+                    hit_keys = [raw for raw, _, _ in rows]
+                    self._conn.execute(
+                        f"UPDATE merchants SET last_used = ? WHERE raw IN ({','.join('?' * len(hit_keys))})",
+                        [now, *hit_keys]
+                    )
+        return found
+
+    def store(self, entries: Dict[str, Tuple[str, str]]) -> None:
+        '''
+        Insert newly resolved merchants, then evict the least recently used entries beyond max_entries
+        '''
+        if not entries or self.max_entries <= 0:
+            return
+
+        now = time.time()
+        with self._conn:
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO merchants (raw, merchant, category, last_used) VALUES (?, ?, ?, ?)",
+                [(raw, merchant, category, now) for raw, (merchant, category) in entries.items()]
+            )
+            self._size += max(cursor.rowcount, 0)
+
+            if self._size > self.max_entries:
+                # Other processes may have inserted too, so recount before deciding how much to drop
+                self._size = self._conn.execute("SELECT COUNT(*) FROM merchants").fetchone()[0]
+                excess = self._size - self.max_entries
+                if excess > 0:
+                    self._conn.execute(
+                        "DELETE FROM merchants WHERE rowid IN "
+                        "(SELECT rowid FROM merchants ORDER BY last_used, rowid LIMIT ?)", (excess,)
+                    )
+                    self._size -= excess
+
+    def resolve(self, values: pd.Series) -> Tuple[pd.Series, pd.Series]:
+        '''
+        Canonical merchants and categories for a Series of distinct raw values: cached ones come from disk,
+        the rest go through parse_merchant_series / assign_category_series and are written back.
+        '''
+        raws = values.tolist()
+        keys = [raw for raw in raws if isinstance(raw, str) and raw]
+        found = self.lookup(list(dict.fromkeys(keys)))
+        hits = sum(raw in found for raw in keys)
+        self.hits += hits
+        self.misses += len(keys) - hits
+
+        merchant_results = [None] * len(raws)
+        category_results = [None] * len(raws)
+        pending = []
+        for position, raw in enumerate(raws):
+            if isinstance(raw, str) and raw in found:
+                merchant_results[position], category_results[position] = found[raw]
+            else:
+                pending.append(position)
+
+        if pending:
+            missing = values.iloc[pending]
+            resolved_merchants = parse_merchant_series(missing)
+            resolved_categories = assign_category_series(resolved_merchants)
+            new_entries = {}
+            for position, merchant, category in zip(pending, resolved_merchants, resolved_categories):
+                merchant_results[position], category_results[position] = merchant, category
+                raw = raws[position]
+                if isinstance(raw, str) and raw:
+                    new_entries[raw] = (merchant, category)
+            self.store(new_entries)
+
+        return (pd.Series(merchant_results, index=values.index, dtype=object),
+                pd.Series(category_results, index=values.index, dtype=object))
+
+    def record(self, hits: int, misses: int) -> None:
+        '''
+        Add counters gathered by the same cache file in a worker process
+        '''
+        self.hits += hits
+        self.misses += misses
+
+    def stats(self) -> Dict[str, int]:
+        '''
+        Hit/miss counters plus current entry count for reporting
+        '''
+        return {"hits": self.hits, "misses": self.misses, "size": self._size}
+
+    def close(self) -> None:
+        '''
+        Close the database connection
+        '''
+        self._conn.close()
@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional
+
+# Which path each distinct value took through the normalizers (e.g. "merchant.fuzzy_hit"), counted per process.
+# Memo hits never reach a normalizer, so these count distinct values, not rows.
+PATH_COUNTS: Counter = Counter()
+
+def count_path(path: str, n: int = 1) -> None:
+    '''
+    Record that n values went down the given normalizer path
+    '''
+    if n:
+        PATH_COUNTS[path] += n
+
+class StageMetrics:
+    '''
+    Wall time, rows and calls per pipeline stage, plus the normalizer path counts seen while it was collecting.
+    Worker processes collect their own and the parent merges them, so stage seconds can add up to more than wall time.
+    add() is thread-safe, so pipelined reader and writer threads can record into the same metrics.
+    '''
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.paths: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float, rows: int = 0, calls: int = 1) -> None:
+        '''
+        Fold one timed call (or a merged total) into a stage
+        '''
+        with self._lock:
+            stage = self.stages.setdefault(name, {"seconds": 0.0, "rows": 0, "calls": 0})
+            stage["seconds"] += seconds
+            stage["rows"] += rows
+            stage["calls"] += calls
+
+    @contextmanager
+    def stage(self, name: str, rows: int = 0):
+        '''
+        Time the enclosed block as one call of a stage over rows rows
+        '''
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - began, rows)
+
+    @contextmanager
+    def counting_paths(self):
+        '''
+        Attribute every normalizer path counted inside the block to these metrics
+        '''
+        before = Counter(PATH_COUNTS)
+        try:
+            yield
+        finally:
+            self.paths.update(PATH_COUNTS - before)
+
+    def timed(self, name: str, frames: Iterable) -> Iterator:
+        '''
+        Pass frames through, timing how long each one takes to produce (e.g. reading the next chunk)
+        '''
+        frames = iter(frames)
+        while True:
+            began = time.perf_counter()
+            try:
+                frame = next(frames)
+            except StopIteration:
+                self.add(name, time.perf_counter() - began, calls=0)
+                return
+            self.add(name, time.perf_counter() - began, len(frame))
+            yield frame
+
+    def state(self) -> Dict:
+        '''
+        Picklable snapshot to send back from a worker process
+        '''
+        return {"stages": self.stages, "paths": dict(self.paths)}
+
+    def merge(self, state: Dict) -> None:
+        '''
+        Add a worker's snapshot into these metrics
+        '''
+        for name, stage in state["stages"].items():
+            self.add(name, stage["seconds"], stage["rows"], stage["calls"])
+        self.paths.update(state["paths"])
+
+    def to_dict(self, wall_seconds: Optional[float] = None) -> Dict:
+        '''
+        JSON-ready summary: wall time, per-stage seconds/rows/calls/rows-per-second and path counts
+        '''
+        if wall_seconds is None:
+            wall_seconds = time.perf_counter() - self.started
+        stages = {
+            name: dict(stage, rows_per_sec=round(stage["rows"] / stage["seconds"], 1) if stage["rows"] and stage["seconds"] > 0 else None)
+            for name, stage in self.stages.items()
+        }
+        return {"wall_seconds": wall_seconds, "stages": stages, "paths": dict(sorted(self.paths.items()))}
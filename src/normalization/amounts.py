@@ -1,13 +1,37 @@
 from typing import Optional
 import re
+import numpy as np
+import pandas as pd
 
-def parse_amount(amount_str: str) -> Optional[float]:
+from src.metrics import count_path
+
+# Characters kept after stripping currency noise, keyed by the decimal separator in use
+_KEEP_PATTERNS = {
+    '.': r'[^\d\.\-]',
+    ',': r'[^\d,\-]',
+}
+
+# What float() accepts once only digits, dots and minus signs remain
+_NUMBER_PATTERN = r'-?(?:[0-9]+\.?[0-9]*|\.[0-9]+)'
+
+# Plain printable ASCII; anything else takes the scalar path so Unicode digits/whitespace keep Python semantics
+_FAST_PATH_PATTERN = r'[\t -~]*'
+
+# Largest cent count a float64 amount holds exactly (2^53); well inside int64 and the decimal128(18, 2) output,
+# so anything beyond it is rejected instead of wrapping
+MAX_AMOUNT_CENTS = 2 ** 53
+
+# Relative slack (about two float64 ulps, at most a quarter cent) for scaling noise such as 1.005 * 100 = 100.49999999999999
+_CENT_TOLERANCE = 2.0 ** -51
+
+def parse_amount(amount_str: str, decimal: str = '.') -> Optional[float]:
     '''
     Normalize noisy currency strings to float; supports accounting negatives with parentheses.
+    Use decimal=',' for European exports such as "1.234,56".
     '''
     if not amount_str:
         return None
-    
+
     raw = amount_str.strip()
     is_negative = False
 
@@ -16,8 +40,10 @@ def parse_amount(amount_str: str) -> Optional[float]:
         is_negative = True
         raw = raw[1:-1]
 
-    # Removes currency symbols/letters/spaces while keeping digits, dot, and minus.
-    cleaned_str = re.sub(r'[^\d\.\-]', '', raw, flags=re.IGNORECASE)
+    # Removes currency symbols/letters/spaces while keeping digits, the decimal separator, and minus.
+    cleaned_str = re.sub(_KEEP_PATTERNS[decimal], '', raw, flags=re.IGNORECASE)
+    if decimal != '.':
+        cleaned_str = cleaned_str.replace(decimal, '.')
 
     try:
         val = float(cleaned_str.strip())
@@ -26,4 +52,60 @@ def parse_amount(amount_str: str) -> Optional[float]:
         return val
     except (ValueError, AttributeError):
         return None
-    
\ No newline at end of file
+
+def parse_amount_series(values: pd.Series, decimal: str = '.') -> pd.Series:
+    '''
+    Column-level parse_amount using vectorized string ops; failures come back as NaN instead of None.
+    '''
+    if decimal not in _KEEP_PATTERNS:
+        raise ValueError(f"Unsupported decimal separator: '{decimal}'")
+
+    result = pd.Series(np.nan, index=values.index, dtype=float)
+    present = values.notna()
+    # The native string dtype lets pandas hand the str ops to pyarrow when it is installed
+    text = values[present].astype("str")
+
+    fast = text.str.fullmatch(_FAST_PATH_PATTERN).eq(True)
+    fast_text = text[fast].str.strip()
+
+    negative = fast_text.str.startswith('(') & fast_text.str.endswith(')')
+    fast_text = fast_text.where(~negative, fast_text.str.slice(1, -1))
+
+    cleaned = fast_text.str.replace(_KEEP_PATTERNS[decimal], '', regex=True)
+    if decimal != '.':
+        cleaned = cleaned.str.replace(decimal, '.', regex=False)
+
+    valid = cleaned.str.fullmatch(_NUMBER_PATTERN).eq(True)
+    numbers = cleaned[valid].astype(float)
+    numbers = numbers.where(~(negative[valid] & (numbers > 0)), -numbers)
+    result[numbers.index] = numbers
+
+    # Non-ASCII values are rare; the scalar parser keeps its exact semantics for them
+    slow = text[~fast]
+    if not slow.empty:
+        result[slow.index] = pd.Series(
+            [parse_amount(value, decimal=decimal) for value in slow], index=slow.index, dtype=float
+        )
+
+    count_path("amount.fast", len(numbers))
+    count_path("amount.scalar", int(result[slow.index].notna().sum()))
+    count_path("amount.invalid", int(result.isna().sum()))
+    return result
+
+def amount_in_range(amount: float) -> bool:
+    '''
+    True when a parsed amount fits in int64 cents without losing precision (MAX_AMOUNT_CENTS)
+    '''
+    return abs(amount) * 100 <= MAX_AMOUNT_CENTS
+
+def amounts_to_cents(amounts: pd.Series) -> pd.Series:
+    '''
+    Parsed amounts to int64 cents. Half-cents round away from zero, as decimal ROUND_HALF_UP does on the written
+    value (0.005 -> 1, 0.015 -> 2, -1.005 -> -101). Callers check amount_in_range first.
+    '''
+    values = amounts.to_numpy(dtype=float)
+    scaled = np.abs(values * 100)
+    whole = np.floor(scaled)
+    slack = np.minimum(np.maximum(scaled, 1.0) * _CENT_TOLERANCE, 0.25)
+    cents = np.sign(values) * (whole + (scaled - whole >= 0.5 - slack))
+    return pd.Series(cents.astype("int64"), index=amounts.index)
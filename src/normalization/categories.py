@@ -1,24 +1,37 @@
 import csv
 from pathlib import Path
 from typing import Dict, List, Optional
+import pandas as pd
 from src.normalization.merchants import get_category_map
+from src.metrics import count_path
 import re
+import warnings
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 KEYWORDS_FILE = BASE_DIR / Path("data/config/keywords.csv")
 DEFAULT_CATEGORY = "Miscellaneous"
 
 _KEYWORD_RULES = {}
+# Rule order doubles as priority: the earliest keyword (as first seen in the config) wins
+_KEYWORD_PRIORITY = {}
+_KEYWORD_MATCHER = None
 
 def load_keywords() -> None:
     '''
     Load keyword-to-category rules from config; supports multiple keywords per row separated by ‘/’.
+    All keywords are compiled into one matcher so classification is a single scan of the name.
     '''
+    global _KEYWORD_MATCHER
+
     if _KEYWORD_RULES:
         return
+
+    from src.normalization.snapshot import restore_snapshot
+    if restore_snapshot() and _KEYWORD_RULES:
+        return
     
     if not KEYWORDS_FILE.exists():
-        print(f"Warning: Keywords config not found at {KEYWORDS_FILE}")
+        warnings.warn(f"Keywords config not found at {KEYWORDS_FILE}")
         return
     
     try:
@@ -33,7 +46,45 @@ def load_keywords() -> None:
                     if keyword:
                         _KEYWORD_RULES[keyword] = category
     except Exception as e:
-        print(f"Error reading keywords CSV: {e}")
+        warnings.warn(f"Error reading keywords CSV: {e}")
+
+    _KEYWORD_PRIORITY.update({keyword: priority for priority, keyword in enumerate(_KEYWORD_RULES)})
+    if _KEYWORD_RULES:
+        # Zero-width lookahead reports a match at every word boundary; inside the alternation, priority order
+        # means the first alternative that fits is the best keyword starting at that position
+        alternation = "|".join(re.escape(keyword) for keyword in _KEYWORD_RULES)
+        _KEYWORD_MATCHER = re.compile(r'\b(?=(' + alternation + r')\b)')
+
+def reset_keywords() -> None:
+    '''
+    Forget loaded keyword rules so the next classification reloads them.
+    '''
+    global _KEYWORD_MATCHER
+
+    _KEYWORD_RULES.clear()
+    _KEYWORD_PRIORITY.clear()
+    _KEYWORD_MATCHER = None
+
+def match_keyword(clean_name: str) -> Optional[str]:
+    '''
+    Category of the highest-priority keyword appearing as a whole word in an upper-cased name, if any.
+    '''
+    load_keywords()
+    if _KEYWORD_MATCHER is None:
+        return None
+
+    best_keyword = None
+    best_priority = len(_KEYWORD_PRIORITY)
+    for match in _KEYWORD_MATCHER.finditer(clean_name):
+        keyword = match.group(1)
+        if _KEYWORD_PRIORITY[keyword] < best_priority:
+            best_keyword, best_priority = keyword, _KEYWORD_PRIORITY[keyword]
+            if best_priority == 0:
+                break
+
+    if best_keyword is None:
+        return None
+    return _KEYWORD_RULES[best_keyword]
 
 def assign_category(merchant_name: str) -> str:
     '''
@@ -48,15 +99,34 @@ def assign_category(merchant_name: str) -> str:
 
     if clean_name in canonical_map:
         return canonical_map[clean_name]
-    
-    for keyword, category in _KEYWORD_RULES.items():
-        if keyword in clean_name:
-            # Boundary regex is used to reduce false positives on short keywords
-            pattern = r'\b' + re.escape(keyword) + r'\b'
 
-            if re.search(pattern, clean_name):
-                return category
-        
-    return DEFAULT_CATEGORY
+    # Boundary matching is used to reduce false positives on short keywords
+    category = match_keyword(clean_name)
+    return DEFAULT_CATEGORY if category is None else category
+
+def assign_category_series(merchant_names: pd.Series) -> pd.Series:
+    '''
+    Column-level assign_category: canonical lookup for the whole column, keyword scan only for the rest.
+    '''
+    load_keywords()
+    canonical_map = get_category_map()
+
+    present = merchant_names.map(lambda name: isinstance(name, str) and bool(name)).astype(bool)
+    # Object dtype keeps Python's upper()/strip() semantics for non-ASCII names
+    clean_names = merchant_names[present].astype(object).str.upper().str.strip()
+
+    categories = pd.Series(DEFAULT_CATEGORY, index=merchant_names.index, dtype=object)
+    canonical = clean_names.map(canonical_map)
+    known = canonical.notna()
+    categories[canonical[known].index] = canonical[known]
+
+    unknown = clean_names[~known]
+    keyword_categories = [match_keyword(name) for name in unknown]
+    categories[unknown.index] = [DEFAULT_CATEGORY if category is None else category for category in keyword_categories]
 
+    keyword_hits = sum(category is not None for category in keyword_categories)
+    count_path("category.canonical", int(known.sum()))
+    count_path("category.keyword", keyword_hits)
+    count_path("category.default", len(merchant_names) - int(known.sum()) - keyword_hits)
 
+    return categories
@@ -1,18 +1,36 @@
 from datetime import date
-from typing import Optional
+from typing import List, Optional
 import re
-from dateutil import parser
+import pandas as pd
+
+from src.metrics import count_path
+
+# Fixed layouts seen in bank exports, each gated by a strict regex so strptime only sees values dateutil reads the same way
+FAST_DATE_FORMATS = {
+    "%Y-%m-%d": r"[0-9]{4}-[0-9]{1,2}-[0-9]{1,2}",
+    "%Y.%m.%d": r"[0-9]{4}\.[0-9]{1,2}\.[0-9]{1,2}",
+    "%Y/%m/%d": r"[0-9]{4}/[0-9]{1,2}/[0-9]{1,2}",
+    "%m/%d/%Y": r"[0-9]{1,2}/[0-9]{1,2}/[0-9]{4}",
+    "%m/%d/%y": r"[0-9]{1,2}/[0-9]{1,2}/[0-9]{2}",
+    "%b %d, %Y": r"[A-Za-z]{3} [0-9]{1,2}, [0-9]{4}",
+    "%d-%b-%Y": r"[0-9]{1,2}-[A-Za-z]{3}-[0-9]{4}",
+}
 
 def parse_date(date_str: str) -> Optional[date]:
     '''
     Parse messy human date strings into a date using dateutil; retry after removing ordinal suffixes.
     '''
     if not date_str:
+        count_path("date.invalid")
         return None
-    
+
+    # Imported on first use so loading the pipeline does not pay for dateutil
+    from dateutil import parser
+
     # Straightforward Parsing
     try:
         dt = parser.parse(date_str, fuzzy=True, dayfirst=False)
+        count_path("date.dateutil")
         return dt.date()
     except (ValueError, TypeError, OverflowError):
         pass
@@ -21,8 +39,87 @@ def parse_date(date_str: str) -> Optional[date]:
     try:
         cleaned_str = re.sub(r'(\d+)(st|nd|rd|th)', r'\1', date_str, flags=re.IGNORECASE)
         dt = parser.parse(cleaned_str, fuzzy=True, dayfirst=False)
+        count_path("date.dateutil_retry")
         return dt.date()
     except (ValueError, TypeError, OverflowError):
         pass
 
+    count_path("date.invalid")
     return None
+
+def detect_date_formats(values: pd.Series, sample_size: int = 1000, min_share: float = 0.01) -> List[str]:
+    '''
+    Sample a column and return the fast-path formats it uses, most common first.
+    '''
+    values = values[values.notna() & (values != "")]
+    if values.empty:
+        return []
+
+    step = max(len(values) // sample_size, 1)
+    sample = values.iloc[::step].iloc[:sample_size].astype(object)
+
+    shares = {}
+    for fmt, pattern in FAST_DATE_FORMATS.items():
+        share = sample.str.fullmatch(pattern).fillna(False).mean()
+        if share > 0 and share >= min_share:
+            shares[fmt] = share
+
+    return sorted(shares, key=shares.get, reverse=True)
+
+def parse_date_series(values: pd.Series, formats: Optional[List[str]] = None) -> pd.Series:
+    '''
+    Column-level parse_date: bulk-convert values in the detected formats, send the leftovers through parse_date.
+    '''
+    if formats is None:
+        formats = detect_date_formats(values)
+
+    result = pd.Series(None, index=values.index, dtype=object)
+    pending = values.notna() & (values != "")
+    raw = values.astype(object)
+
+    for fmt in formats:
+        candidates = pending & raw.str.fullmatch(FAST_DATE_FORMATS[fmt]).fillna(False).astype(bool)
+        if not candidates.any():
+            continue
+
+        converted = pd.to_datetime(raw[candidates], format=fmt, errors='coerce')
+        converted = converted[converted.notna()]
+        if converted.empty:
+            continue
+
+        if "%y" in fmt:
+            converted = _apply_dateutil_century(converted)
+        else:
+            # dateutil may re-anchor years below 100 depending on the layout, so leave them to parse_date
+            converted = converted[converted.dt.year >= 100]
+            if converted.empty:
+                continue
+
+        result[converted.index] = converted.dt.date
+        pending[converted.index] = False
+        count_path("date.fast_format", len(converted))
+
+    # Anything the fast formats rejected (including empty values) keeps the exact scalar semantics
+    leftovers = result.isna()
+    if leftovers.any():
+        result[leftovers] = values[leftovers].map(parse_date)
+
+    return result
+
+def _apply_dateutil_century(converted: pd.Series) -> pd.Series:
+    '''
+    Re-anchor two-digit years with dateutil's rolling window instead of strptime's fixed 1969 pivot.
+    '''
+    from dateutil import parser
+
+    two_digit = converted.dt.year % 100
+    years = two_digit.map({yy: parser.DEFAULTPARSER.info.convertyear(yy) for yy in two_digit.unique()})
+    shift = (years - converted.dt.year).astype("int64")
+
+    if not shift.any():
+        return converted
+
+    return pd.Series(
+        [ts.replace(year=ts.year + delta) for ts, delta in zip(converted, shift)],
+        index=converted.index,
+    )
@@ -0,0 +1,85 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+import pandas as pd
+
+DEFAULT_MEMO_SIZE = 100_000
+
+class ValueCache:
+    '''
+    Column memoizer: factorize a column, normalize each distinct raw value once, broadcast results back.
+    A bounded LRU carries results across batches so the long tail does not grow memory without limit.
+    '''
+
+    def __init__(self, name: str, batch_func: Callable[[pd.Series], pd.Series], maxsize: int = DEFAULT_MEMO_SIZE) -> None:
+        '''
+        batch_func receives a Series of distinct raw values and returns their normalized values in the same order
+        '''
+        self.name = name
+        self.batch_func = batch_func
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Any, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def map(self, values: pd.Series) -> pd.Series:
+        '''
+        Normalize a column; every row whose raw value was already seen (in this batch or the LRU) counts as a hit
+        '''
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+
+        results = [None] * len(uniques)
+        missing = []
+        for position, raw in enumerate(uniques):
+            if raw in self._entries:
+                self._entries.move_to_end(raw)
+                results[position] = self._entries[raw]
+            else:
+                missing.append(position)
+
+        if missing:
+            computed = self.batch_func(pd.Series([uniques[position] for position in missing], dtype=object))
+            for position, value in zip(missing, computed.tolist()):
+                results[position] = value
+                self._store(uniques[position], value)
+
+        self.misses += len(missing)
+        self.hits += len(values) - len(missing)
+
+        return pd.Series(results).take(codes).set_axis(values.index)
+
+    def _store(self, raw: Any, value: Any) -> None:
+        '''
+        Insert a result, evicting the least recently used entries beyond maxsize; NaN keys are never cached
+        '''
+        if self.maxsize <= 0 or pd.isna(raw):
+            return
+
+        self._entries[raw] = value
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def seed(self, keys: pd.Series, values: pd.Series) -> None:
+        '''
+        Store results computed elsewhere (e.g. categories that came with a cached merchant) without counting them
+        '''
+        for raw, value in zip(keys.tolist(), values.tolist()):
+            self._store(raw, value)
+
+    def record(self, hits: int, misses: int) -> None:
+        '''
+        Add counters gathered elsewhere, e.g. by the same cache in a worker process
+        '''
+        self.hits += hits
+        self.misses += misses
+
+    def clear(self) -> None:
+        '''
+        Drop cached results, e.g. after the merchant or keyword config is reloaded
+        '''
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        '''
+        Hit/miss counters plus current LRU size for reporting
+        '''
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
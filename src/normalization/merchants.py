@@ -1,26 +1,106 @@
 import csv
+import os
 import re
+import warnings
+from collections import Counter, defaultdict
 from pathlib import Path
-from typing import Dict, List, Optional
-from rapidfuzz import process, fuzz
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+from src.metrics import count_path
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 MERCHANT_FILE = BASE_DIR / Path("data/config/canonical_merchants.csv")
+NOISE_FILE = BASE_DIR / Path("data/config/noise_words.csv")
+
+FUZZY_CUTOFF = 80.0
+# Queries scored per cdist call; bounds the score matrix to FUZZY_BATCH_SIZE x len(_CANONICAL_NAMES)
+FUZZY_BATCH_SIZE = 4096
+# cdist scores every pair without extractOne's early exits, so it only pays off on a large batch spread over
+# several cores; smaller batches or single-core hosts resolve name by name
+FUZZY_CDIST_MIN_NAMES = 1000
+
+# Below this many canonical names a brute-force scan is cheap and exact, so no index is built
+FUZZY_INDEX_MIN_NAMES = 5000
+# Candidates scored per query when the index is active; higher keeps more recall, lower is faster
+FUZZY_INDEX_CANDIDATES = 256
 
 # Module-level caches avoid re-reading config on every row
 _CANONICAL_NAMES = []
 _CATEGORY_MAP = {}
 _TICKER_ALIASES = {}
+_FUZZY_INDEX = None
+_NOISE_WORDS = []
+_CLEAN_PATTERN = None
+
+# Separators become spaces before noise removal so "UBER*TRIP" and "AMAZON.COM" split into words
+_SEPARATOR_TABLE = str.maketrans({'*': ' ', '.': ' ', '_': ' '})
+
+class NgramIndex:
+    '''
+    Character n-gram inverted index that narrows a fuzzy query to the canonical names sharing the most n-grams.
+    '''
+
+    def __init__(self, names: List[str], n: int = 3, max_share: float = 0.05) -> None:
+        '''
+        Build postings once; n-grams found in more than max_share of names carry little signal and are skipped at query time
+        '''
+        self.n = n
+        postings = defaultdict(list)
+        gram_counts = np.zeros(len(names), dtype=np.float64)
+
+        for name_id, name in enumerate(names):
+            grams = self._grams(name)
+            gram_counts[name_id] = max(len(grams), 1)
+            for gram in grams:
+                postings[gram].append(name_id)
+
+        self._postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._norms = np.sqrt(gram_counts)
+        self._max_postings = max(int(len(names) * max_share), 1)
+
+    def _grams(self, text: str) -> set:
+        '''
+        Padded character n-grams so word starts and ends carry their own grams
+        '''
+        padded = f" {text} "
+        return {padded[i:i + self.n] for i in range(len(padded) - self.n + 1)}
+
+    def candidates(self, query: str, limit: int) -> np.ndarray:
+        '''
+        Ids of up to limit names ranked by cosine overlap of n-grams, returned in ascending (config) order
+        '''
+        lists = [self._postings[gram] for gram in self._grams(query) if gram in self._postings]
+        rare = [ids for ids in lists if len(ids) <= self._max_postings]
+        lists = rare or lists
+        if not lists:
+            return np.empty(0, dtype=np.int32)
+
+        ids, counts = np.unique(np.concatenate(lists), return_counts=True)
+        if len(ids) > limit:
+            scores = counts / self._norms[ids]
+            ids = ids[np.argpartition(-scores, limit - 1)[:limit]]
+
+        return np.sort(ids)
 
 def load_merchant_db():
     '''
     Lazy-load canonical merchant names, categories, and optional ticker aliases from config CSV.
+    Large vendor masters also get an n-gram index so fuzzy matching scores a candidate subset.
+    A fresh compiled snapshot (see snapshot.py) replaces the CSV read entirely.
     '''
+    global _FUZZY_INDEX
+
     if _CANONICAL_NAMES:
         return
+
+    from src.normalization.snapshot import restore_snapshot
+    if restore_snapshot() and _CANONICAL_NAMES:
+        return
     
     if not MERCHANT_FILE.exists():
-        print(f"Merchant DB not found at {MERCHANT_FILE}")
+        warnings.warn(f"Merchant DB not found at {MERCHANT_FILE}")
         return
     
     try:
@@ -38,68 +118,231 @@ def load_merchant_db():
                 if ticker:
                     _TICKER_ALIASES[ticker] = name
     except Exception as e:
-        print(f"Error reading merchant CSV: {e}")
-        pass
+        warnings.warn(f"Error reading merchant CSV: {e}")
 
-def clean_merchant_name(raw: str) -> str:
+    if len(_CANONICAL_NAMES) >= FUZZY_INDEX_MIN_NAMES:
+        _FUZZY_INDEX = NgramIndex(_CANONICAL_NAMES)
+
+def load_noise_words() -> None:
     '''
-    Standardize merchant text by removing corporate suffixes/noise and normalizing separators.
+    Lazy-load corporate suffixes/noise words from config and compile them with the symbol filter into one regex.
     '''
-    s = raw.upper().strip()
+    global _CLEAN_PATTERN
+
+    if _CLEAN_PATTERN is not None:
+        return
 
-    for separator in ['*', '.', '_']:
-        s = s.replace(separator, ' ')
+    from src.normalization.snapshot import restore_snapshot
+    if restore_snapshot() and _CLEAN_PATTERN is not None:
+        return
 
-    common_noise = [r'INC', r'LLC', r'LTD', r'CORP', 
-                    r'US', r'USA', r'TECHNOLOGIES', r'NV', r'BV', 
-                    r'WWW', r'CO', r'ORG']
-    
-    for noise_word in common_noise:
-        pattern = r'\b' + noise_word + r'\b'
-        s = re.sub(pattern, '', s)
+    if not NOISE_FILE.exists():
+        warnings.warn(f"Noise word list not found at {NOISE_FILE}")
+    else:
+        try:
+            with open(NOISE_FILE, mode='r', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    word = row['noise_word'].strip().upper()
+                    if word:
+                        _NOISE_WORDS.append(word)
+        except Exception as e:
+            warnings.warn(f"Error reading noise word CSV: {e}")
 
-    s = re.sub(r'[^A-Z0-9\s]', '', s)
+    # Whole noise words and stray symbols are both decided on the same string, so one substitution pass
+    # removes exactly what the word-by-word removal followed by the symbol filter used to
+    alternatives = [r'[^A-Z0-9\s]']
+    if _NOISE_WORDS:
+        alternatives.insert(0, r'\b(?:' + '|'.join(re.escape(word) for word in _NOISE_WORDS) + r')\b')
+    _CLEAN_PATTERN = re.compile('|'.join(alternatives))
+
+def reset_merchant_config() -> None:
+    '''
+    Forget loaded merchants, aliases, the fuzzy index and noise words so the next lookup reloads them.
+    '''
+    global _FUZZY_INDEX, _CLEAN_PATTERN
+
+    _CANONICAL_NAMES.clear()
+    _CATEGORY_MAP.clear()
+    _TICKER_ALIASES.clear()
+    _NOISE_WORDS.clear()
+    _FUZZY_INDEX = None
+    _CLEAN_PATTERN = None
+
+def clean_merchant_name(raw: str) -> str:
+    '''
+    Standardize merchant text by removing corporate suffixes/noise and normalizing separators.
+    '''
+    load_noise_words()
+
+    s = raw.upper().strip().translate(_SEPARATOR_TABLE)
+    s = _CLEAN_PATTERN.sub('', s)
 
     return " ".join(s.split())
 
-def parse_merchant(raw_merchant: str) -> str:
+def clean_merchant_names(values: pd.Series) -> pd.Series:
     '''
-    Canonicalize a raw merchant using cleaning, optional ticker alias expansion, exact match, then fuzzy match.
+    Column-level clean_merchant_name using vectorized string ops (pyarrow-backed when installed).
     '''
-    if not raw_merchant or not isinstance(raw_merchant, str):
-        return "UNKNOWN"
-    
-    load_merchant_db()
+    load_noise_words()
+
+    text = values.astype("str")
+    result = pd.Series("", index=values.index, dtype=object)
+
+    # On printable ASCII, \b, \s, upper() and split() agree across regex engines; everything else stays scalar
+    fast = text.str.fullmatch(r'[\t -~]*').eq(True)
+    s = text[fast].str.upper().str.strip().str.replace(r'[*._]', ' ', regex=True)
+    s = s.str.replace(_CLEAN_PATTERN.pattern, '', regex=True)
+    result[fast] = s.str.replace(r'\s+', ' ', regex=True).str.strip().astype(object)
 
-    cleaned_input = clean_merchant_name(raw_merchant)
+    slow = values[~fast]
+    if not slow.empty:
+        result[~fast] = [clean_merchant_name(raw) for raw in slow]
 
+    return result
+
+def _prepare_merchant(cleaned_input: str) -> Tuple[str, Optional[str]]:
+    '''
+    Ticker-expand a cleaned merchant; return it with the path that resolved it ("exact", "ticker_alias",
+    "no_config"), or None when it still needs fuzzy matching.
+    '''
     if not _CANONICAL_NAMES:
-        return cleaned_input
-    
+        return cleaned_input, "no_config"
+
     first_word = cleaned_input.split(' ')[0]
+    path = "exact"
 
     if first_word in _TICKER_ALIASES:
         canonical_name = _TICKER_ALIASES[first_word]
         cleaned_input = cleaned_input.replace(first_word, canonical_name, 1)
+        path = "ticker_alias"
 
     # Exact Match
-    if cleaned_input in _CATEGORY_MAP:
-        return cleaned_input
+    return cleaned_input, path if cleaned_input in _CATEGORY_MAP else None
+
+def parse_merchant(raw_merchant: str) -> str:
+    '''
+    Canonicalize a raw merchant using cleaning, optional ticker alias expansion, exact match, then fuzzy match.
+    '''
+    if not raw_merchant or not isinstance(raw_merchant, str):
+        return "UNKNOWN"
     
+    load_merchant_db()
+
+    cleaned_input, path = _prepare_merchant(clean_merchant_name(raw_merchant))
+    if path is not None:
+        return cleaned_input
+
     # Fuzzy Match
+    match_name = _fuzzy_match(cleaned_input)
+    if match_name is not None:
+        return match_name
+
+    # Return Cleaned Name
+    return cleaned_input
+
+def _fuzzy_match(cleaned_input: str) -> Optional[str]:
+    '''
+    Best canonical name at or above the cutoff; scans every name, or only index candidates for large configs.
+    '''
+    from rapidfuzz import process, fuzz
+
+    choices = _CANONICAL_NAMES
+    if _FUZZY_INDEX is not None and FUZZY_INDEX_CANDIDATES:
+        choices = [_CANONICAL_NAMES[i] for i in _FUZZY_INDEX.candidates(cleaned_input, FUZZY_INDEX_CANDIDATES)]
+
     result = process.extractOne(
         cleaned_input,
-        _CANONICAL_NAMES,
+        choices,
         scorer=fuzz.token_set_ratio,
-        score_cutoff=80.0
+        score_cutoff=FUZZY_CUTOFF
     )
 
     if result:
         match_name, score, _ = result
         return match_name
 
-    # Return Cleaned Name
-    return cleaned_input
+    return None
+
+def _fuzzy_threads() -> int:
+    '''
+    Cores this process may run on, i.e. the threads cdist(workers=-1) can actually use
+    '''
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def resolve_fuzzy(names: List[str]) -> List[Optional[str]]:
+    '''
+    Score many cleaned names against the canonical list at once; best match per name, or None below the cutoff.
+    '''
+    from rapidfuzz import process, fuzz
+
+    load_merchant_db()
+
+    # The index path already scores only a few hundred names per query, so a dense score matrix buys nothing
+    indexed = _FUZZY_INDEX is not None and FUZZY_INDEX_CANDIDATES
+    if indexed or len(names) < FUZZY_CDIST_MIN_NAMES or _fuzzy_threads() < 2:
+        return [_fuzzy_match(name) for name in names]
+
+    matches = []
+    for start in range(0, len(names), FUZZY_BATCH_SIZE):
+        batch = names[start:start + FUZZY_BATCH_SIZE]
+        # float64 keeps scores identical to extractOne so cutoff and tie-breaking agree
+        scores = process.cdist(
+            batch,
+            _CANONICAL_NAMES,
+            scorer=fuzz.token_set_ratio,
+            score_cutoff=FUZZY_CUTOFF,
+            dtype=np.float64,
+            workers=-1
+        )
+        # argmax returns the first best column, the same winner extractOne keeps on ties
+        best = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(batch)), best]
+
+        for index, score in zip(best, best_scores):
+            matches.append(_CANONICAL_NAMES[index] if score >= FUZZY_CUTOFF else None)
+
+    return matches
+
+def parse_merchant_series(values: pd.Series) -> pd.Series:
+    '''
+    Column-level parse_merchant: exact and ticker lookups per value, then one batched fuzzy pass for the misses.
+    '''
+    load_merchant_db()
+
+    present = values.map(lambda raw: isinstance(raw, str) and bool(raw)).astype(bool).tolist()
+    cleaned = iter(clean_merchant_names(values[present]).tolist())
+
+    results = []
+    pending = []
+    paths = Counter()
+    for position, is_present in enumerate(present):
+        if not is_present:
+            results.append("UNKNOWN")
+            paths["unknown"] += 1
+            continue
+
+        cleaned_input, path = _prepare_merchant(next(cleaned))
+        results.append(cleaned_input)
+        if path is None:
+            pending.append(position)
+        else:
+            paths[path] += 1
+
+    if pending:
+        matches = resolve_fuzzy([results[position] for position in pending])
+        for position, match_name in zip(pending, matches):
+            if match_name is not None:
+                results[position] = match_name
+        paths["fuzzy_hit"] = sum(match_name is not None for match_name in matches)
+        paths["fuzzy_miss"] = len(matches) - paths["fuzzy_hit"]
+
+    for path, n in paths.items():
+        count_path(f"merchant.{path}", n)
+
+    return pd.Series(results, index=values.index, dtype=object)
 
 def get_category_map() -> Dict[str, str]:
     '''
@@ -0,0 +1,161 @@
+import hashlib
+import os
+import pickle
+import warnings
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.normalization import merchants, categories
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+SNAPSHOT_FILE = BASE_DIR / Path("data/config/compiled_config.pkl")
+
+# Bump whenever the pickled layout or the meaning of any cached structure changes
+SNAPSHOT_VERSION = 1
+
+# The snapshot is tried at most once per process, on the first config lookup
+_SNAPSHOT_CHECKED = False
+
+def _source_files() -> Dict[str, Path]:
+    '''
+    Config CSVs baked into the snapshot, read from the modules so overridden paths are respected
+    '''
+    return {
+        "merchants": Path(merchants.MERCHANT_FILE),
+        "noise_words": Path(merchants.NOISE_FILE),
+        "keywords": Path(categories.KEYWORDS_FILE),
+    }
+
+def _file_digest(path: Path) -> Optional[str]:
+    '''
+    SHA-256 of a config file, None when it does not exist
+    '''
+    if not path.exists():
+        return None
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+def _describe_source(path: Path) -> Dict:
+    '''
+    Path, size, mtime and content hash of one source file
+    '''
+    stat = path.stat() if path.exists() else None
+    return {
+        "path": str(path),
+        "size": stat.st_size if stat else None,
+        "mtime_ns": stat.st_mtime_ns if stat else None,
+        "sha256": _file_digest(path),
+    }
+
+def _is_fresh(recorded: Dict[str, Dict]) -> bool:
+    '''
+    True if every source still matches: same path, and same size/mtime or (after a touch) the same content
+    '''
+    current = _source_files()
+    if set(recorded) != set(current):
+        return False
+
+    for name, path in current.items():
+        source = recorded[name]
+        if source["path"] != str(path):
+            return False
+        stat = path.stat() if path.exists() else None
+        if stat and (stat.st_size, stat.st_mtime_ns) == (source["size"], source["mtime_ns"]):
+            continue
+        if _file_digest(path) != source["sha256"]:
+            return False
+    return True
+
+def reset_config() -> None:
+    '''
+    Forget all loaded merchant, noise-word and keyword config; the next lookup tries the snapshot again
+    '''
+    global _SNAPSHOT_CHECKED
+
+    merchants.reset_merchant_config()
+    categories.reset_keywords()
+    _SNAPSHOT_CHECKED = False
+
+def compile_config(path: Path = SNAPSHOT_FILE) -> Path:
+    '''
+    Load every config CSV from source, build derived matchers and indexes, and pickle them into one versioned file
+    '''
+    global _SNAPSHOT_CHECKED
+
+    reset_config()
+    # Loading from CSV must not pick up the snapshot being replaced
+    _SNAPSHOT_CHECKED = True
+    merchants.load_merchant_db()
+    merchants.load_noise_words()
+    categories.load_keywords()
+
+    payload = {
+        "version": SNAPSHOT_VERSION,
+        "sources": {name: _describe_source(source) for name, source in _source_files().items()},
+        "merchants": {
+            "canonical_names": merchants._CANONICAL_NAMES,
+            "category_map": merchants._CATEGORY_MAP,
+            "ticker_aliases": merchants._TICKER_ALIASES,
+            "fuzzy_index": merchants._FUZZY_INDEX,
+            "noise_words": merchants._NOISE_WORDS,
+            "clean_pattern": merchants._CLEAN_PATTERN,
+        },
+        "keywords": {
+            "rules": categories._KEYWORD_RULES,
+            "priority": categories._KEYWORD_PRIORITY,
+            "matcher": categories._KEYWORD_MATCHER,
+        },
+    }
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(path.name + ".tmp")
+    with open(temp_path, "wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+
+    return path
+
+def restore_snapshot(path: Optional[Path] = None) -> bool:
+    '''
+    Populate merchant, noise-word and keyword state from a fresh snapshot; False (use the CSVs) when it is
+    missing, unreadable, from another version, or older than any of its sources.
+    '''
+    global _SNAPSHOT_CHECKED
+
+    if _SNAPSHOT_CHECKED:
+        return False
+    _SNAPSHOT_CHECKED = True
+
+    path = Path(path) if path is not None else SNAPSHOT_FILE
+    if not path.exists():
+        return False
+
+    try:
+        with open(path, "rb") as f:
+            payload = pickle.load(f)
+    except Exception as e:
+        warnings.warn(f"Ignoring unreadable config snapshot {path}: {e}")
+        return False
+
+    if payload.get("version") != SNAPSHOT_VERSION or not _is_fresh(payload["sources"]):
+        warnings.warn(f"Config snapshot {path} is stale; loading config CSVs (re-run compile-config to refresh)")
+        return False
+
+    merchant_state = payload["merchants"]
+    merchants._CANONICAL_NAMES[:] = merchant_state["canonical_names"]
+    merchants._CATEGORY_MAP.clear()
+    merchants._CATEGORY_MAP.update(merchant_state["category_map"])
+    merchants._TICKER_ALIASES.clear()
+    merchants._TICKER_ALIASES.update(merchant_state["ticker_aliases"])
+    merchants._FUZZY_INDEX = merchant_state["fuzzy_index"]
+    merchants._NOISE_WORDS[:] = merchant_state["noise_words"]
+    merchants._CLEAN_PATTERN = merchant_state["clean_pattern"]
+
+    keyword_state = payload["keywords"]
+    categories._KEYWORD_RULES.clear()
+    categories._KEYWORD_RULES.update(keyword_state["rules"])
+    categories._KEYWORD_PRIORITY.clear()
+    categories._KEYWORD_PRIORITY.update(keyword_state["priority"])
+    categories._KEYWORD_MATCHER = keyword_state["matcher"]
+
+    return True
@@ -1,26 +1,167 @@
+import itertools
+import json
+import multiprocessing
+import os
+import time
+import numpy as np
 import pandas as pd
+from collections import Counter, deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-import sys
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from src.normalization.dates import parse_date
-from src.normalization.amounts import parse_amount
-from src.normalization.merchants import parse_merchant
-from src.normalization.categories import assign_category
+from src.normalization.dates import parse_date, parse_date_series
+from src.normalization.amounts import MAX_AMOUNT_CENTS, amount_in_range, amounts_to_cents, parse_amount, parse_amount_series
+from src.normalization.merchants import parse_merchant, parse_merchant_series, load_merchant_db, load_noise_words
+from src.normalization.categories import assign_category, assign_category_series, load_keywords
+from src.normalization.memo import ValueCache, DEFAULT_MEMO_SIZE
+from src.sharding import read_header, plan_shards, read_shard, last_record_end
+from src.merchant_cache import MerchantCache, DEFAULT_MAX_ENTRIES, merchant_config_hash
+from src.incremental import config_fingerprint, input_fingerprint, load_state, save_state
+from src.metrics import StageMetrics
+from src.formats import FORMATS, SOURCE_COLUMN, csv_compression, iter_frames, make_writer, open_csv_source, read_columns
+from src.batch import BATCH_CHUNK_ROWS, READ_THREADS, expand_inputs, is_batch_input
+from src.pipelining import BackgroundConsumer, prefetch
+
+# Reason codes attached to failed rows; messages keep the wording of the per-row path (a blank value is "missing")
+INVALID_DATE = "INVALID_DATE"
+MISSING_DATE = "MISSING_DATE"
+INVALID_AMOUNT = "INVALID_AMOUNT"
+MISSING_AMOUNT = "MISSING_AMOUNT"
+AMOUNT_OUT_OF_RANGE = "AMOUNT_OUT_OF_RANGE"
+
+ERROR_MESSAGES = {
+    INVALID_DATE: "Invalid Date Format: '{value}'",
+    MISSING_DATE: "Invalid Date Format: '{value}'",
+    INVALID_AMOUNT: "Invalid Amount Format: '{value}'",
+    MISSING_AMOUNT: "Invalid Amount Format: '{value}'",
+    AMOUNT_OUT_OF_RANGE: "Amount Out Of Range: '{value}'",
+}
+ERROR_CODES = list(ERROR_MESSAGES)
+
+# Mapping key whose raw value is echoed in each reason code's message
+ERROR_SOURCES = {
+    INVALID_DATE: "date",
+    MISSING_DATE: "date",
+    INVALID_AMOUNT: "amount",
+    MISSING_AMOUNT: "amount",
+    AMOUNT_OUT_OF_RANGE: "amount",
+}
+
+# Histogram rows in the report, one per reason code and source column
+ERROR_LABELS = {
+    INVALID_DATE: "Invalid date",
+    MISSING_DATE: "Missing value",
+    INVALID_AMOUNT: "Invalid amount",
+    MISSING_AMOUNT: "Missing value",
+    AMOUNT_OUT_OF_RANGE: "Amount out of range",
+}
+
+# Columns appended to every error record: the compact code, the raw column it is about, and the rendered message
+ERROR_COLUMNS = ["Error_Code", "Error_Column", "Error_Reason"]
+
+# Row block size used when re-reading the full input to recover the original columns of failed rows
+FETCH_CHUNK_ROWS = 20_000
+
+CSV_ENGINES = ("c", "pyarrow")
+
+# Byte-range size used by incremental runs when no shard size was given
+DEFAULT_SHARD_BYTES = 64 * 1024 * 1024
+
+# Pool workers start from a clean server process rather than a fork of this one: reader and writer threads may
+# already be running, and a lock one of them holds at fork time would stay locked forever in the child
+POOL_START_METHOD = "forkserver"
+
+class PipelineError(Exception):
+    '''
+    Raised by run() when the input cannot be loaded or mapped; the CLI turns it into a non-zero exit
+    '''
+
+# Warm per-process pipeline used by pool workers; built once by _init_worker
+_WORKER_PIPELINE = None
 
 class FinancialPipeline:
     '''
     Orchestrates loading, normalization, error capture, and summary reporting for transaction CSVs
     '''
 
-    def __init__(self, input_path: str, output_path: str) -> None:
+    def __init__(self, input_path: str = "", output_path: str = "", decimal: str = '.', memo_size: int = DEFAULT_MEMO_SIZE,
+                 chunksize: Optional[int] = None, workers: int = 1, shard_bytes: Optional[int] = None,
+                 engine: str = "c", project_columns: bool = False, input_format: str = "csv",
+                 output_format: str = "csv", partition: bool = False, incremental: bool = False,
+                 merchant_cache: Optional[str] = None, merchant_cache_size: int = DEFAULT_MAX_ENTRIES,
+                 verbose: bool = True, pipelined: bool = False, max_error_samples: Optional[int] = None) -> None:
         '''
-        Initialize paths and stats; report and error files are written alongside the output
+        Initialize paths and stats; report and error files are written alongside the output.
+        Pass decimal=',' for European amount formatting such as "1.234,56".
+        memo_size bounds each per-column LRU of already-normalized raw values.
+        chunksize streams the input in row chunks so memory stays flat regardless of file size.
+        workers > 1 normalizes chunks in a process pool; output order is unchanged.
+        shard_bytes memory-maps the input and has each worker parse and normalize its own byte range.
+        engine picks the pandas CSV parser ("c" or "pyarrow"); pyarrow cannot stream row chunks.
+        project_columns loads only the mapped columns; error rows are re-read in full afterwards.
+        input_format/output_format pick csv, parquet or arrow; .gz/.zst CSV paths are (de)compressed as streams.
+        partition writes output as a Hive-style year=/month= directory tree rooted at output_path.
+        incremental keeps a state file next to the output and only normalizes rows appended since the last run.
+        merchant_cache names a SQLite file that remembers resolved merchants across runs (up to merchant_cache_size).
+        verbose=False silences progress messages; paths can be left empty when only normalize() is used.
+        input_path may also be a directory or glob: every file is mapped and read on its own, and all of them go
+        into one output, error log and report with a Source_File column.
+        pipelined runs reading, normalizing and writing on separate threads joined by bounded queues; output order is unchanged.
+        max_error_samples keeps at most that many error records per reason code; the report still counts every failure.
         '''
+        batch = bool(input_path) and is_batch_input(input_path)
+        if batch and (chunksize or shard_bytes or incremental or project_columns):
+            raise ValueError("Directory/glob input reads each file whole; chunksize, sharding, incremental mode "
+                             "and column projection need a single input file")
+        for fmt in (input_format, output_format):
+            if fmt not in FORMATS:
+                raise ValueError(f"Unsupported format: {fmt!r}")
+        if shard_bytes and (input_format != "csv" or csv_compression(Path(input_path))):
+            raise ValueError("Sharded input requires an uncompressed CSV file")
+        if incremental and (input_format != "csv" or csv_compression(Path(input_path))):
+            raise ValueError("Incremental mode requires an uncompressed CSV input file")
+        if incremental and (output_format != "csv" or partition):
+            raise ValueError("Incremental mode appends to a single CSV output file")
+        if engine not in CSV_ENGINES:
+            raise ValueError(f"Unsupported CSV engine: {engine!r}")
+        if engine == "pyarrow" and chunksize is not None:
+            raise ValueError("The pyarrow CSV engine does not support chunked reads")
+
         self.input_path = Path(input_path)
+        self.batch = batch
         self.output_path = Path(output_path)
+        self.decimal = decimal
+        self.memo_size = memo_size
+        self.chunksize = chunksize
+        self.workers = workers
+        self.shard_bytes = shard_bytes
+        self.engine = engine
+        self.project_columns = project_columns
+        self.input_format = input_format
+        self.output_format = output_format
+        self.partition = partition
+        self.incremental = incremental
+        self.merchant_cache_path = merchant_cache
+        self.merchant_cache_size = merchant_cache_size
+        self.verbose = verbose
+        self.pipelined = pipelined
+        self.max_error_samples = max_error_samples
+        self.merchant_cache = MerchantCache(merchant_cache, merchant_cache_size) if merchant_cache else None
+
+        # Each normalizer runs once per distinct raw value; categories are keyed on the canonical merchant
+        self.memo = {
+            "date": ValueCache("date", parse_date_series, memo_size),
+            "amount": ValueCache("amount", lambda values: parse_amount_series(values, decimal=self.decimal), memo_size),
+            "merchant": ValueCache("merchant", self.resolve_merchants if self.merchant_cache else parse_merchant_series, memo_size),
+            "category": ValueCache("category", assign_category_series, memo_size),
+        }
         self.report_path = self.output_path.parent / "data_quality_report.txt"
         self.error_path = self.output_path.parent / "errors.log"
+        self.state_path = self.output_path.parent / "pipeline_state.json"
+        self.metrics_path = self.output_path.parent / "metrics.json"
+        self.metrics = StageMetrics()
 
         self.stats = {
             "total_rows": 0,
@@ -29,20 +170,119 @@ class FinancialPipeline:
             "top_category": "N/A",
             "total_spend": 0.0
         }
+        # Built up chunk by chunk in integer cents so the report never needs the full clean frame and sums stay exact
+        self.category_spend = pd.Series(dtype="int64")
+        self.total_spend_cents = 0
+        # Row counts and spend per input file of a batch run, in file order
+        self.file_stats: Dict[str, Dict] = {}
+        # Failures per (reason code, source column), and error records kept per reason code under max_error_samples
+        self.error_counts: Counter = Counter()
+        self.error_samples: Counter = Counter()
 
-    def load_data(self) -> pd.DataFrame:
+    def log(self, message: str) -> None:
+        '''
+        Progress message for the CLI; silent when the pipeline is embedded with verbose=False
+        '''
+        if self.verbose:
+            print(message)
+
+    def resolve_merchants(self, values: pd.Series) -> pd.Series:
+        '''
+        Merchant memo backend when a persistent cache is configured; the categories it returns seed the category memo
+        '''
+        merchant_names, merchant_categories = self.merchant_cache.resolve(values)
+        self.memo["category"].seed(merchant_names, merchant_categories)
+        return merchant_names
+
+    def counted_caches(self) -> Dict:
+        '''
+        Every cache with hit/miss counters, keyed by report name
+        '''
+        caches = dict(self.memo)
+        if self.merchant_cache is not None:
+            caches["merchant_cache"] = self.merchant_cache
+        return caches
+
+    def sniff_header(self) -> pd.DataFrame:
+        '''
+        Parse only the header record into an empty frame so columns can be mapped before any data is read
+        '''
+        if not self.input_path.exists():
+            raise FileNotFoundError(f"Error: Input file not found at {self.input_path}")
+
+        if self.input_format != "csv":
+            return pd.DataFrame(columns=read_columns(self.input_path, self.input_format))
+        with open_csv_source(self.input_path) as source:
+            return pd.read_csv(source, nrows=0, dtype=str)
+
+    def projected_columns(self, mapping: Dict[str, str]) -> Optional[List[str]]:
+        '''
+        Columns to load for a mapping, or None for all of them when projection is off
+        '''
+        if not self.project_columns:
+            return None
+        return list(dict.fromkeys(mapping[key] for key in ['date', 'merchant', 'amount']))
+
+    def load_data(self, usecols: Optional[List[str]] = None) -> pd.DataFrame:
         '''
         Read CSV as strings to avoid dtype surprises; replace NaNs with empty strings for safer parsing
         '''
         if not self.input_path.exists():
             raise FileNotFoundError(f"Error: Input file not found at {self.input_path}")
         
-        print(f"Loading data from {self.input_path}")
-        df = pd.read_csv(self.input_path, dtype=str)
+        self.log(f"Loading data from {self.input_path}")
+        if self.input_format != "csv":
+            return next(iter_frames(self.input_path, self.input_format, None, usecols))
+
+        with open_csv_source(self.input_path) as source:
+            df = pd.read_csv(source, dtype=str, usecols=usecols, engine=self.engine)
         df = df.fillna("")
 
         return df
-    
+
+    def load_chunks(self, usecols: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        '''
+        Yield the input as string frames of at most chunksize rows; without a chunksize the whole file is one frame
+        '''
+        if self.chunksize is None:
+            yield self.load_data(usecols)
+            return
+
+        if not self.input_path.exists():
+            raise FileNotFoundError(f"Error: Input file not found at {self.input_path}")
+
+        self.log(f"Streaming data from {self.input_path} in chunks of {self.chunksize} rows")
+        yield from self._read_blocks(self.chunksize, usecols)
+
+    def _read_blocks(self, rows: int, usecols: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        '''
+        Stream the input in blocks of rows string-typed rows, in any input format
+        '''
+        if self.input_format != "csv":
+            yield from iter_frames(self.input_path, self.input_format, rows, usecols)
+            return
+
+        # Chunks keep a running row index, so error rows still point at their position in the file
+        with open_csv_source(self.input_path) as source:
+            for chunk in pd.read_csv(source, dtype=str, usecols=usecols, chunksize=rows):
+                yield chunk.fillna("")
+
+    def fetch_rows(self, row_index: pd.Index) -> Iterator[pd.DataFrame]:
+        '''
+        Re-read the input with every column and yield only the rows at the given positions, block by block.
+        Positions are the row index load_chunks assigns, so a projected read can recover full error records.
+        '''
+        wanted = pd.Index(row_index)
+        if wanted.empty:
+            return
+
+        for block in self._read_blocks(self.chunksize or FETCH_CHUNK_ROWS):
+            rows = block[block.index.isin(wanted)]
+            if not rows.empty:
+                yield rows
+            if block.index[-1] >= wanted.max():
+                break
+
     def map_columns(self, df: pd.DataFrame) -> Dict[str, str]:
         '''
         Heuristically infer date/merchant/amount columns from flexible header names
@@ -71,7 +311,7 @@ class FinancialPipeline:
         if missing:
             raise ValueError(f"Could not automatically identify columns for: {', '.join(missing)}")
 
-        print(f"Column Mapping Found: {mapping}")
+        self.log(f"Column Mapping Found: {mapping}")
         return mapping
 
     def process_row(self, row:pd.Series, mapping: Dict[str, str]) -> Tuple[Optional[Dict], Optional[Dict]]:
@@ -85,14 +325,25 @@ class FinancialPipeline:
         clean_date = parse_date(raw_date)
         if not clean_date:
             error_row = row.to_dict()
+            error_row['Error_Code'] = MISSING_DATE if not raw_date.strip() else INVALID_DATE
+            error_row['Error_Column'] = mapping['date']
             error_row['Error_Reason'] = f"Invalid Date Format: '{raw_date}'"
             return None, error_row
         
-        clean_amount = parse_amount(raw_amt)
+        clean_amount = parse_amount(raw_amt, decimal=self.decimal)
         if clean_amount is None:
             error_row = row.to_dict()
+            error_row['Error_Code'] = MISSING_AMOUNT if not raw_amt.strip() else INVALID_AMOUNT
+            error_row['Error_Column'] = mapping['amount']
             error_row['Error_Reason'] = f"Invalid Amount Format: '{raw_amt}'"
             return None, error_row
+
+        if not amount_in_range(clean_amount):
+            error_row = row.to_dict()
+            error_row['Error_Code'] = AMOUNT_OUT_OF_RANGE
+            error_row['Error_Column'] = mapping['amount']
+            error_row['Error_Reason'] = f"Amount Out Of Range: '{raw_amt}'"
+            return None, error_row
         
         # Missing merchant currently normalizes to UNKNOWN because transaction is still valid
         clean_merchant = parse_merchant(raw_merc)
@@ -107,77 +358,696 @@ class FinancialPipeline:
         }
 
         return success, None
-        
-    def generate_report(self, df: pd.DataFrame) -> None:
+
+    def process_batch(self, df: pd.DataFrame, mapping: Dict[str, str]) -> Tuple[pd.DataFrame, pd.Series, pd.Series]:
+        '''
+        Normalize whole columns at once; return clean rows, a failure mask, and per-row categorical reason codes (NaN on success).
+        Clean rows are typed: datetime64 Date, categorical Merchant/Category, int64 Amount in cents.
+        '''
+        with self.metrics.stage("date", len(df)):
+            dates = self.memo["date"].map(df[mapping['date']])
+        date_failed = dates.isna()
+
+        # Amounts are only parsed where the date succeeded, matching the per-row short circuit
+        with self.metrics.stage("amount", int((~date_failed).sum())):
+            amounts = self.memo["amount"].map(df.loc[~date_failed, mapping['amount']]).reindex(df.index)
+        amount_failed = amounts.isna() & ~date_failed
+        # Amounts that would not fit in int64 cents fail instead of wrapping
+        out_of_range = amounts.abs().mul(100).gt(MAX_AMOUNT_CENTS)
+
+        failed = date_failed | amount_failed | out_of_range
+        reasons = self.reason_codes(df, mapping, date_failed, amount_failed, out_of_range)
+
+        ok = ~failed
+        with self.metrics.stage("merchant", int(ok.sum())):
+            merchants = self.memo["merchant"].map(df.loc[ok, mapping['merchant']])
+        with self.metrics.stage("category", len(merchants)):
+            categories = self.memo["category"].map(merchants)
+
+        # Day precision covers years 1-9999 like datetime.date; seconds is the coarsest unit pandas keeps
+        clean_dates = np.array(dates[ok].tolist(), dtype="datetime64[D]").astype("datetime64[s]")
+
+        clean_df = pd.DataFrame({
+            "Date": clean_dates,
+            "Merchant": merchants.astype("category"),
+            # Half-cents round away from zero
+            "Amount": amounts_to_cents(amounts[ok]),
+            "Category": categories.astype("category"),
+        }, index=df.index[ok])
+
+        return clean_df, failed, reasons
+
+    def reason_codes(self, df: pd.DataFrame, mapping: Dict[str, str], date_failed: pd.Series,
+                     amount_failed: pd.Series, out_of_range: pd.Series) -> pd.Series:
+        '''
+        One-byte categorical reason code per row: date failures win over amount failures, and a blank raw value
+        is MISSING_* rather than INVALID_*
+        '''
+        codes = np.full(len(df), -1, dtype=np.int8)
+        codes[out_of_range.to_numpy()] = ERROR_CODES.index(AMOUNT_OUT_OF_RANGE)
+        for mask, key, invalid, missing in [(amount_failed, 'amount', INVALID_AMOUNT, MISSING_AMOUNT),
+                                            (date_failed, 'date', INVALID_DATE, MISSING_DATE)]:
+            hit = mask.to_numpy()
+            blank = df.loc[mask, mapping[key]].str.strip().eq("").to_numpy()
+            codes[hit] = np.where(blank, ERROR_CODES.index(missing), ERROR_CODES.index(invalid))
+        return pd.Series(pd.Categorical.from_codes(codes, ERROR_CODES), index=df.index)
+
+    def failure_codes(self, mapping: Dict[str, str], failed: pd.Series, reasons: pd.Series) -> pd.DataFrame:
+        '''
+        Compact record of every failed row: its index plus the one-byte Error_Code and the Error_Column it is about.
+        Stats and the error histogram come from these, so full rows are only needed for the records that are kept.
+        '''
+        codes = reasons[failed]
+        return pd.DataFrame({
+            'Error_Code': codes,
+            'Error_Column': codes.astype(object).map({code: mapping[ERROR_SOURCES[code]] for code in ERROR_CODES}).astype("category"),
+        }, index=codes.index)
+
+    def build_error_records(self, df: pd.DataFrame, failures: pd.DataFrame) -> pd.DataFrame:
+        '''
+        Expand the given failures back into their original columns plus Error_Code and Error_Column.
+        Messages are rendered later by render_error_reasons, only for the records that are written.
+        '''
+        error_df = df.loc[failures.index].copy()
+        error_df['Error_Code'] = failures['Error_Code']
+        error_df['Error_Column'] = failures['Error_Column']
+        return error_df
+
+    def render_error_reasons(self, error_df: pd.DataFrame) -> pd.DataFrame:
+        '''
+        Add the human-readable Error_Reason to error records, echoing the raw value of each record's Error_Column
+        '''
+        codes = error_df['Error_Code'].astype(object).to_numpy()
+        columns = error_df['Error_Column'].astype(object).to_numpy()
+        messages = np.full(len(error_df), "", dtype=object)
+
+        for code, column in set(zip(codes, columns)):
+            hit = (codes == code) & (columns == column)
+            template = ERROR_MESSAGES[code]
+            messages[hit] = [template.format(value=value) for value in error_df[column].to_numpy()[hit]]
+
+        return error_df.assign(Error_Reason=messages)
+
+    def sample_errors(self, error_df: pd.DataFrame, taken: Counter) -> pd.DataFrame:
+        '''
+        Error records (or failure codes) still under max_error_samples for their reason code, given the counts
+        already taken (updated)
+        '''
+        if self.max_error_samples is None or error_df.empty:
+            return error_df
+
+        codes = error_df['Error_Code'].astype(object)
+        position = codes.groupby(codes.to_numpy()).cumcount().to_numpy()
+        offset = codes.map(taken).fillna(0).to_numpy()
+        keep = position + offset < self.max_error_samples
+
+        for code, count in codes[keep].value_counts().items():
+            taken[code] += int(count)
+        return error_df[keep]
+
+    def normalize_chunk(self, raw_df: pd.DataFrame, mapping: Dict[str, str]) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        '''
+        Normalize one raw frame into its clean rows, its error records and the failure codes of every failed row.
+        Under max_error_samples only the first failures per reason code are expanded into error records.
+        '''
+        with self.metrics.counting_paths():
+            clean_df, failed, reasons = self.process_batch(raw_df, mapping)
+        with self.metrics.stage("errors", int(failed.sum())):
+            failures = self.failure_codes(mapping, failed, reasons)
+            # No chunk can contribute more than the cap per code, so the other failed rows are never copied or pickled
+            error_df = self.build_error_records(raw_df, self.sample_errors(failures, Counter()))
+        return clean_df, error_df, failures
+
+    def normalize_chunks(self, chunks: Iterable[pd.DataFrame], mapping: Dict[str, str]) -> Iterator[Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]]:
+        '''
+        Normalize chunks in input order, in-process or across the worker pool
+        '''
+        if self.workers <= 1:
+            for raw_df in chunks:
+                yield self.normalize_chunk(raw_df, mapping)
+            return
+
+        # In a pipelined run the prefetch reader and the writer thread are already running, so the pool must not fork
+        with self.process_pool() as executor:
+            if self.chunksize is None:
+                # A single in-memory frame is fanned out as slices, then reassembled so stats and writes
+                # see exactly the batch a serial run would
+                results = list(self._pool_map(executor, mapping, self._split_frame(next(iter(chunks)))))
+                # Slices carry their own category sets, which concat would widen to plain strings
+                clean_df = pd.concat([clean for clean, _, _ in results]).astype({"Merchant": "category", "Category": "category"})
+                yield clean_df, pd.concat([errors for _, errors, _ in results]), pd.concat([failures for _, _, failures in results])
+            else:
+                yield from self._pool_map(executor, mapping, chunks)
+
+    def process_pool(self) -> ProcessPoolExecutor:
+        '''
+        Worker pool whose processes each build a warm pipeline (_init_worker), started with POOL_START_METHOD
+        ('spawn' where the platform lacks it) so live threads in this process are never forked
+        '''
+        method = POOL_START_METHOD if POOL_START_METHOD in multiprocessing.get_all_start_methods() else "spawn"
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=self.worker_options(),
+                                   mp_context=multiprocessing.get_context(method))
+
+    def worker_options(self) -> Tuple:
+        '''
+        Arguments for _init_worker so pool workers normalize exactly like this pipeline
+        '''
+        return self.decimal, self.memo_size, self.merchant_cache_path, self.merchant_cache_size, self.max_error_samples
+
+    def _split_frame(self, df: pd.DataFrame) -> Iterator[pd.DataFrame]:
+        '''
+        Slice a frame into a few tasks per worker so slow slices do not leave other workers idle
+        '''
+        size = max(-(-len(df) // (self.workers * 4)), 1)
+        for start in range(0, max(len(df), 1), size):
+            yield df.iloc[start:start + size]
+
+    def normalize_shards(self, columns: List[str], data_start: int, mapping: Dict[str, str],
+                         end: Optional[int] = None) -> Iterator[Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]]:
         '''
-        Aggregate category spend and write a concise data-quality + spending summary.
+        Normalize the input as newline-aligned byte ranges; each worker maps the file and parses only its own range
         '''
-        if not df.empty:
-            category_spend = df.groupby("Category")["Amount"].sum()
-            if not category_spend.empty:
-                top_category = category_spend.idxmax()
-                top_val = category_spend.max()
-                self.stats["top_category"] = f"{top_category} (${top_val:,.2f})"
-                self.stats["total_spend"] = df["Amount"].sum()
+        shards = plan_shards(self.input_path, data_start, self.shard_bytes or DEFAULT_SHARD_BYTES, end)
+        self.log(f"Split {self.input_path} into {len(shards)} byte-range shards")
 
+        if self.workers <= 1:
+            raw_frames = (read_shard(self.input_path, start, end, columns) for start, end in shards)
+            for raw_df in self.metrics.timed("load", raw_frames):
+                yield self.normalize_chunk(raw_df, mapping)
+            return
+
+        task = partial(_normalize_shard_in_worker, path=self.input_path, columns=columns)
+        with self.process_pool() as executor:
+            yield from self._pool_map(executor, mapping, shards, task)
+
+    def _pool_map(self, executor: Executor, mapping: Optional[Dict[str, str]], items: Iterable,
+                  worker_task: Optional[Callable] = None) -> Iterator[Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]]:
+        '''
+        Ordered map over the pool with a bounded number of tasks in flight, folding worker memo counters
+        and stage metrics back in
+        '''
+        task = worker_task or _normalize_in_worker
+        # Without a mapping, items are (raw frame, mapping) pairs for the worker task to unpack
+        if mapping is not None:
+            task = partial(task, mapping=mapping)
+        for clean_df, error_df, failures, memo_counts, metrics in ordered_map(executor, task, items, window=self.workers * 2):
+            self.merge_worker_counts(memo_counts, metrics)
+            yield clean_df, error_df, failures
+
+    def merge_worker_counts(self, memo_counts: Dict[str, Tuple[int, int]], metrics: Dict) -> None:
+        '''
+        Fold the memo hits/misses and stage metrics a pool task reported into this pipeline's own
+        '''
+        caches = self.counted_caches()
+        for name, (hits, misses) in memo_counts.items():
+            caches[name].record(hits, misses)
+        self.metrics.merge(metrics)
+
+    def file_reader(self, path: Path) -> "FinancialPipeline":
+        '''
+        Silent single-file pipeline used to sniff and load one file of a batch with this pipeline's read options
+        '''
+        return FinancialPipeline(input_path=str(path), input_format=self.input_format, engine=self.engine, verbose=False)
+
+    def map_input_files(self) -> Tuple[List[Path], Dict[Path, Dict[str, str]], List[str]]:
+        '''
+        Expand a batch input and map every file's own header (read in threads). Also returns the error log columns:
+        Source_File, the union of all raw columns in first-seen order, and the error code columns, so every file's
+        error rows line up in one log.
+        '''
+        files = expand_inputs(str(self.input_path), self.input_format)
+        with ThreadPoolExecutor(max_workers=READ_THREADS) as readers:
+            headers = list(readers.map(lambda path: self.file_reader(path).sniff_header(), files))
+
+        mappings, columns = {}, {}
+        for path, header in zip(files, headers):
+            try:
+                mappings[path] = self.file_reader(path).map_columns(header)
+            except ValueError as e:
+                raise ValueError(f"{path}: {e}") from e
+            columns.update(dict.fromkeys(header.columns))
+
+        layouts = {tuple(sorted(mapping.items())) for mapping in mappings.values()}
+        self.log(f"Column Mapping Found for {len(files)} files ({len(layouts)} distinct layouts)")
+        return files, mappings, [SOURCE_COLUMN, *columns, "Error_Code", "Error_Column"]
+
+    def read_input_file(self, path: Path) -> Tuple[pd.DataFrame, float]:
+        '''
+        Reader-thread task: load one batch file whole and report how long it took
+        '''
+        began = time.perf_counter()
+        raw_df = self.file_reader(path).load_data()
+        return raw_df, time.perf_counter() - began
+
+    def normalize_files(self, files: List[Path], mappings: Dict[Path, Dict[str, str]],
+                        error_columns: List[str]) -> Iterator[Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]]:
+        '''
+        Normalize a batch in file order. A thread pool reads files while earlier ones are normalized (in-process or in
+        the worker pool); rows come back tagged with Source_File and counted per file.
+        '''
+        with ThreadPoolExecutor(max_workers=READ_THREADS) as readers:
+            loads = ordered_map(readers, self.read_input_file, files, window=READ_THREADS * 2)
+            groups = self.group_files(files, mappings, loads)
+            if self.pipelined:
+                groups = prefetch(groups, self.metrics, "reader", "normalize")
+            if self.workers <= 1:
+                for names, sizes, raw_df, mapping in groups:
+                    yield self._tag_files(names, sizes, *self.normalize_chunk(raw_df, mapping), error_columns)
+                return
+
+            # Results come back in submission order, so each one belongs to the oldest group still pending
+            pending = deque()
+
+            def frames() -> Iterator[Tuple[pd.DataFrame, Dict[str, str]]]:
+                for names, sizes, raw_df, mapping in groups:
+                    pending.append((names, sizes))
+                    yield raw_df, mapping
+
+            # The reader threads are already running, so the pool must not fork this process
+            with self.process_pool() as executor:
+                for result in self._pool_map(executor, None, frames(), _normalize_file_in_worker):
+                    yield self._tag_files(*pending.popleft(), *result, error_columns)
+
+    def group_files(self, files: List[Path], mappings: Dict[Path, Dict[str, str]],
+                    loads: Iterable[Tuple[pd.DataFrame, float]]) -> Iterator[Tuple[List[str], List[int], pd.DataFrame, Dict[str, str]]]:
+        '''
+        Coalesce consecutive files that share a column mapping into frames of up to BATCH_CHUNK_ROWS rows, so many
+        small files pay the per-chunk cost once per group instead of once per file.
+        Yields (file names, row count per file, combined frame numbered from 0, mapping).
+        '''
+        names, sizes, frames, rows, mapping = [], [], [], 0, None
+        for path, (raw_df, seconds) in zip(files, loads):
+            self.metrics.add("load", seconds, len(raw_df))
+            if frames and (mappings[path] != mapping or rows + len(raw_df) > BATCH_CHUNK_ROWS):
+                yield names, sizes, pd.concat(frames, ignore_index=True).fillna(""), mapping
+                names, sizes, frames, rows = [], [], [], 0
+            names.append(str(path))
+            sizes.append(len(raw_df))
+            frames.append(raw_df)
+            rows += len(raw_df)
+            mapping = mappings[path]
+
+        if frames:
+            yield names, sizes, pd.concat(frames, ignore_index=True).fillna(""), mapping
+
+    def _tag_files(self, names: List[str], sizes: List[int], clean_df: pd.DataFrame, error_df: pd.DataFrame,
+                   failures: pd.DataFrame, error_columns: List[str]) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        '''
+        Add Source_File to a group's clean and error rows (found from each row's position in the combined frame),
+        align error rows to the batch's error columns, and record per-file counts
+        '''
+        bounds = np.cumsum(sizes)
+        clean_files = np.searchsorted(bounds, clean_df.index.to_numpy(), side="right")
+        error_files = np.searchsorted(bounds, error_df.index.to_numpy(), side="right")
+        failed_files = np.searchsorted(bounds, failures.index.to_numpy(), side="right")
+
+        clean_df[SOURCE_COLUMN] = pd.Categorical.from_codes(clean_files, names)
+        error_df = error_df.assign(**{SOURCE_COLUMN: np.array(names, dtype=object)[error_files]})
+        error_df = error_df.reindex(columns=error_columns, fill_value="")
+
+        success = np.bincount(clean_files, minlength=len(names))
+        failed = np.bincount(failed_files, minlength=len(names))
+        spend = clean_df.groupby(clean_files)["Amount"].sum()
+        for number, name in enumerate(names):
+            self.file_stats[name] = {
+                "total_rows": int(success[number] + failed[number]),
+                "success_rows": int(success[number]),
+                "failed_rows": int(failed[number]),
+                "total_spend": int(spend.get(number, 0)) / 100,
+            }
+        return clean_df, error_df, failures
+
+    def update_stats(self, clean_df: pd.DataFrame, failures: pd.DataFrame) -> None:
+        '''
+        Fold one normalized chunk (its clean rows and the failure codes of every failed row) into the running row
+        counts, error histogram and category spend totals
+        '''
+        self.stats["total_rows"] += len(clean_df) + len(failures)
+        self.stats["success_rows"] += len(clean_df)
+        self.stats["failed_rows"] += len(failures)
+
+        if not failures.empty:
+            histogram = failures.groupby(['Error_Code', 'Error_Column'], observed=True).size()
+            self.error_counts.update({key: int(count) for key, count in histogram.items() if count})
+
+        if not clean_df.empty:
+            chunk_spend = clean_df.groupby("Category", observed=True)["Amount"].sum()
+            chunk_spend.index = chunk_spend.index.astype(object)
+            self.category_spend = self.category_spend.add(chunk_spend, fill_value=0).astype("int64")
+            self.total_spend_cents += int(clean_df["Amount"].sum())
+            self.stats["total_spend"] = self.total_spend_cents / 100
+
+    def config_key(self, columns: List[str]) -> str:
+        '''
+        Fingerprint of everything besides the input that shapes the output: config files, header and options
+        '''
+        options = {"columns": columns, "decimal": self.decimal, "output": str(self.output_path),
+                   "merchant_config": merchant_config_hash()}
+        return config_fingerprint([], options)
+
+    def resume_offset(self, columns: List[str], data_start: int) -> Tuple[int, int]:
+        '''
+        Byte offset to continue from and the error count already logged, restoring the saved aggregates.
+        Returns (data_start, 0) for a full rebuild: no state, changed config, missing output, or rewritten input.
+        '''
+        state = load_state(self.state_path)
+        if state is None:
+            self.log("No incremental state found; processing the whole file")
+            return data_start, 0
+
+        offset = state["offset"]
+        reason = None
+        if state["config"] != self.config_key(columns):
+            reason = "merchant/keyword config or options changed"
+        elif not self.output_path.exists() or self.output_path.stat().st_size < state["output_bytes"]:
+            reason = f"previous output {self.output_path} is missing or truncated"
+        elif state["error_count"] and (not self.error_path.exists() or self.error_path.stat().st_size < state["error_bytes"]):
+            reason = f"previous error log {self.error_path} is missing or truncated"
+        elif self.input_path.stat().st_size < offset or input_fingerprint(self.input_path, offset) != state["fingerprint"]:
+            reason = "input file was rewritten, not appended to"
+
+        if reason is not None:
+            self.log(f"Full rebuild: {reason}")
+            return data_start, 0
+
+        # Drop whatever an interrupted run appended after the last saved state
+        os.truncate(self.output_path, state["output_bytes"])
+        if state["error_count"]:
+            os.truncate(self.error_path, state["error_bytes"])
+
+        self.stats.update(state["stats"])
+        self.error_counts = Counter({(code, column): count for code, column, count in state.get("error_counts", [])})
+        self.error_samples = Counter(state.get("error_samples", {}))
+        self.total_spend_cents = state["total_spend_cents"]
+        self.stats["total_spend"] = self.total_spend_cents / 100
+        self.category_spend = pd.Series(state["category_spend"], dtype="int64")
+        self.log(f"Resuming after {state['stats']['total_rows']} rows (byte {offset})")
+        return offset, state["error_count"]
+
+    def save_incremental_state(self, columns: List[str], offset: int, error_count: int) -> None:
+        '''
+        Record how far the input has been processed together with the cumulative report aggregates
+        '''
+        save_state(self.state_path, {
+            "input": str(self.input_path),
+            "offset": offset,
+            "fingerprint": input_fingerprint(self.input_path, offset),
+            "config": self.config_key(columns),
+            "stats": {key: self.stats[key] for key in ["total_rows", "success_rows", "failed_rows"]},
+            "total_spend_cents": self.total_spend_cents,
+            "category_spend": {category: int(cents) for category, cents in self.category_spend.items()},
+            "error_counts": [[code, column, count] for (code, column), count in self.error_counts.items()],
+            "error_samples": dict(self.error_samples),
+            "error_count": error_count,
+            "output_bytes": self.output_path.stat().st_size,
+            "error_bytes": self.error_path.stat().st_size if error_count else 0,
+        })
+
+    def build_report(self) -> Dict:
+        '''
+        Report aggregates gathered by update_stats so far: row counts, spend (total and per category), the error
+        histogram (most frequent first) and cache counters
+        '''
+        if not self.category_spend.empty:
+            top_category = self.category_spend.idxmax()
+            top_val = self.category_spend.max() / 100
+            self.stats["top_category"] = f"{top_category} (${top_val:,.2f})"
+
+        report = dict(
+            self.stats,
+            category_spend={category: int(cents) / 100 for category, cents in self.category_spend.items()},
+            errors=[{"code": code, "column": column, "count": count}
+                    for (code, column), count in self.error_counts.most_common()],
+            caches={name: cache.stats() for name, cache in self.counted_caches().items()},
+            metrics=self.metrics.to_dict(),
+        )
+        if self.file_stats:
+            report["files"] = self.file_stats
+        return report
+
+    def generate_report(self) -> None:
+        '''
+        Write a concise data-quality + spending summary from the aggregates gathered by update_stats.
+        '''
+        report = self.build_report()
         report_content = (
             f"FINANCIAL DATA REPORT\n"
             f"================================\n"
-            f"Input File: {self.input_path.name}\n"
-            f"Total Rows:   {self.stats['total_rows']}\n"
-            f"Successfully Parsed: {self.stats['success_rows']}\n"
-            f"Failed / Skipped: {self.stats['failed_rows']}\n"
+            f"Input File: {self.input_path if self.batch else self.input_path.name}\n"
+            f"Total Rows:   {report['total_rows']}\n"
+            f"Successfully Parsed: {report['success_rows']}\n"
+            f"Failed / Skipped: {report['failed_rows']}\n"
             f"--------------------------------\n"
-            f"Total Spend: ${self.stats['total_spend']:,.2f}\n"
-            f"Top Category: {self.stats['top_category']}\n"
+            f"Total Spend: ${report['total_spend']:,.2f}\n"
+            f"Top Category: {report['top_category']}\n"
             f"Clean Data: {self.output_path}\n"
             f"Error Log: {self.error_path}\n"
+            "--------------------------------\n"
+            "Errors by Type [source column]:\n"
         )
+        for error in report["errors"]:
+            report_content += f"  {ERROR_LABELS[error['code']]} [{error['column']}]: {error['count']}\n"
+        if not report["errors"]:
+            report_content += "  none\n"
+        if self.max_error_samples is not None:
+            logged = sum(self.error_samples.values())
+            report_content += f"Error Samples Logged: {logged} of {report['failed_rows']} (max {self.max_error_samples} per type)\n"
+        if "files" in report:
+            report_content += (
+                "--------------------------------\n"
+                f"Input Files: {len(report['files'])} (rows / parsed / failed, spend)\n"
+            )
+            for name, file_stats in report["files"].items():
+                report_content += (f"  {name}: {file_stats['total_rows']} / {file_stats['success_rows']} / "
+                                   f"{file_stats['failed_rows']}, ${file_stats['total_spend']:,.2f}\n")
 
         with open(self.report_path, "w", encoding='utf-8') as f:
             f.write(report_content)
 
-        print("\n" + report_content)
-        print(f"Report saved to {self.report_path}")
+        self.log("\n" + report_content)
+        # Each worker keeps its own caches, so hit/miss counts depend on --workers; they stay out of the report file
+        self.log("Memo Cache (hits / misses): " + ", ".join(
+            f"{name} {cache_stats['hits']} / {cache_stats['misses']}" for name, cache_stats in report["caches"].items()))
+        self.log(f"Report saved to {self.report_path}")
+
+    def write_metrics(self) -> None:
+        '''
+        Write stage timings, rows/sec and normalizer path counts as machine-readable JSON next to the report
+        '''
+        metrics = dict(self.metrics.to_dict(), rows=self.stats["total_rows"],
+                       caches={name: cache.stats() for name, cache in self.counted_caches().items()})
+        with open(self.metrics_path, "w", encoding='utf-8') as f:
+            json.dump(metrics, f, indent=2)
+        self.log(f"Metrics saved to {self.metrics_path}")
+
+    def write_errors(self, error_df: pd.DataFrame, error_count: int) -> int:
+        '''
+        Render and append error records to the error log (header on the first batch); return the running error count
+        '''
+        error_df = self.render_error_reasons(error_df)
+        # Despite .log extension, errors are stored in CSV for easy review
+        error_df.to_csv(self.error_path, mode="w" if error_count == 0 else "a", header=error_count == 0, index=False)
+        return error_count + len(error_df)
+
+    def normalize(self, df: pd.DataFrame, mapping: Optional[Dict[str, str]] = None) -> Tuple[pd.DataFrame, pd.DataFrame, Dict]:
+        '''
+        Normalize a frame already in memory, with no file I/O: returns typed clean rows, error records and the report.
+        Columns are mapped from the header when no mapping is given. Calls on the same pipeline share warm caches,
+        and the report accumulates across them.
+        '''
+        # Work on positions so any caller index (duplicate labels included) is safe; labels are restored at the end
+        raw_df = df.astype(object).where(df.notna(), "").astype(str).reset_index(drop=True)
+        if mapping is None:
+            with self.metrics.stage("map_columns"):
+                mapping = self.map_columns(raw_df)
+        missing = [key for key in ['date', 'merchant', 'amount'] if mapping.get(key) not in raw_df.columns]
+        if missing:
+            raise ValueError(f"Mapped columns not found for: {', '.join(missing)}")
+
+        chunks = [raw_df]
+        if self.chunksize:
+            chunks = [raw_df.iloc[start:start + self.chunksize] for start in range(0, len(raw_df), self.chunksize)] or chunks
+        clean_parts, error_parts = [], []
+        # The sample cap applies per call, so one bad batch does not hide the errors of later ones
+        taken = Counter()
+        for clean_df, error_df, failures in self.normalize_chunks(chunks, mapping):
+            self.update_stats(clean_df, failures)
+            clean_parts.append(clean_df)
+            error_parts.append(self.sample_errors(error_df, taken))
+
+        clean_df = pd.concat(clean_parts).astype({"Merchant": "category", "Category": "category"})
+        error_df = pd.concat(error_parts).astype({"Error_Column": "category"})
+        clean_df.index = df.index[clean_df.index]
+        error_df.index = df.index[error_df.index]
+        return clean_df, self.render_error_reasons(error_df), self.build_report()
 
     def run(self) -> None:
         '''
-        End-to-end workflow: load → map columns → normalize rows → write outputs → generate report
+        End-to-end workflow: load → map columns → normalize columns → write outputs → generate report.
+        With a chunksize every stage runs per chunk and outputs are appended as they are produced.
         '''
-        print("Starting Financial Parser")
+        self.log("Starting Financial Parser")
+        self.metrics = StageMetrics()
+        error_count = 0
+        append = False
 
         try:
-            raw_df = self.load_data()
-            self.stats["total_rows"] = len(raw_df)
-            col_map = self.map_columns(raw_df)
+            if self.batch:
+                with self.metrics.stage("map_columns"):
+                    files, file_mappings, error_columns = self.map_input_files()
+                results = self.normalize_files(files, file_mappings, error_columns)
+            elif self.shard_bytes or self.incremental:
+                if not self.input_path.exists():
+                    raise FileNotFoundError(f"Error: Input file not found at {self.input_path}")
+                columns, data_start = read_header(self.input_path)
+                with self.metrics.stage("map_columns"):
+                    col_map = self.map_columns(pd.DataFrame(columns=columns))
+                start, end = data_start, None
+                if self.incremental:
+                    start, error_count = self.resume_offset(columns, data_start)
+                    append = start > data_start
+                    # Only complete records are taken, so a line still being written waits for the next run
+                    end = last_record_end(self.input_path, start, len(columns))
+                    held_back = self.input_path.stat().st_size - end
+                    if held_back:
+                        self.log(f"Holding back {held_back} bytes of an incomplete last line until the next run")
+                results = self.normalize_shards(columns, start, col_map, end)
+            else:
+                header = self.sniff_header()
+                with self.metrics.stage("map_columns"):
+                    col_map = self.map_columns(header)
+                chunks = self.metrics.timed("load", self.load_chunks(self.projected_columns(col_map)))
+                # Without a chunksize this reads the whole file, so load failures still surface here
+                first_chunk = next(chunks)
+                chunks = itertools.chain([first_chunk], chunks)
+                if self.pipelined:
+                    # The reader thread parses the next chunks while this one is normalized
+                    chunks = prefetch(chunks, self.metrics, "reader", "normalize")
+                results = self.normalize_chunks(chunks, col_map)
         except Exception as e:
-            print(f"Critical Error during loading and setup: {e}")
-            sys.exit(1)
-        
-        clean_rows = []
-        error_rows = []
-        print("Normalizing data")
-
-        for _, row in raw_df.iterrows():
-            success_data, error_data = self.process_row(row, col_map)
-            if success_data:
-                clean_rows.append(success_data)
-                self.stats["success_rows"] += 1
-            elif error_data:
-                error_rows.append(error_data)
-                self.stats["failed_rows"] += 1
+            raise PipelineError(f"Critical Error during loading and setup: {e}") from e
         
-        clean_df = pd.DataFrame(clean_rows)
+        self.log("Normalizing data")
         self.output_path.parent.mkdir(parents=True, exist_ok=True)
-        clean_df.to_csv(self.output_path, index=False)
-        print(f"Clean data saved to {self.output_path}")
-
-        if error_rows:
-            error_df = pd.DataFrame(error_rows)
-            error_df.to_csv(self.error_path, index=False)
-            # Despite .log extension, errors are stored in CSV for easy review
-            print(f"{len(error_rows)} errors logged to {self.error_path}")
+        writer = make_writer(self.output_path, self.output_format, self.partition, append, source_file=self.batch)
+        # With projection only reason codes are kept; the full original rows are fetched once normalization is done
+        deferred_reasons = []
+
+        def write_chunk(result: Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]) -> None:
+            nonlocal error_count
+            clean_df, error_df, failures = result
+            self.update_stats(clean_df, failures)
+            with self.metrics.stage("write", len(clean_df) + len(error_df)):
+                writer.write(clean_df)
+
+                error_df = self.sample_errors(error_df, self.error_samples)
+                if self.project_columns and not (self.shard_bytes or self.incremental):
+                    # Only row positions and one-byte codes wait for the full rows to be fetched
+                    deferred_reasons.append(error_df[['Error_Code', 'Error_Column']])
+                elif not error_df.empty:
+                    error_count = self.write_errors(error_df, error_count)
+
+        try:
+            if self.pipelined:
+                # Stats and writes (including compression) happen on the writer thread, in result order
+                with BackgroundConsumer(write_chunk, self.metrics, "normalize", "writer") as sink:
+                    for result in results:
+                        sink.put(result)
+            else:
+                for result in results:
+                    write_chunk(result)
+        finally:
+            with self.metrics.stage("write"):
+                writer.close()
+
+        if deferred_reasons:
+            reasons = pd.concat(deferred_reasons)
+            for rows in self.metrics.timed("error_fetch", self.fetch_rows(reasons.index)):
+                rows[['Error_Code', 'Error_Column']] = reasons.loc[rows.index]
+                with self.metrics.stage("write", len(rows)):
+                    error_count = self.write_errors(rows, error_count)
+
+        if self.incremental:
+            # Saved only after the outputs are complete; a run interrupted before this point is redone next time
+            self.save_incremental_state(columns, end, error_count)
+
+        self.log(f"Clean data saved to {self.output_path}")
+        if error_count:
+            self.log(f"{error_count} errors logged to {self.error_path}")
         else:
-            print("No errors found!")
+            self.log("No errors found!")
+
+        with self.metrics.stage("report"):
+            self.generate_report()
+        self.write_metrics()
+
+
+def normalize(df: pd.DataFrame, mapping: Optional[Dict[str, str]] = None, **options) -> Tuple[pd.DataFrame, pd.DataFrame, Dict]:
+    '''
+    One-shot in-memory normalization with a fresh, silent pipeline; options are FinancialPipeline keyword arguments.
+    Keep a FinancialPipeline(verbose=False) around instead to reuse warm caches across batches.
+    '''
+    return FinancialPipeline(**dict({"verbose": False}, **options)).normalize(df, mapping)
+
+def ordered_map(executor: Executor, func: Callable, items: Iterable, window: int) -> Iterator:
+    '''
+    Like executor.map, but keeps at most window tasks in flight so a streamed input is never read ahead in full
+    '''
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+
+    while pending:
+        yield pending.popleft().result()
+
+def _init_worker(decimal: str, memo_size: int, merchant_cache: Optional[str], merchant_cache_size: int,
+                 max_error_samples: Optional[int]) -> None:
+    '''
+    Pool initializer: load merchant, noise-word and keyword config once per process and keep a warm pipeline
+    '''
+    global _WORKER_PIPELINE
+
+    load_merchant_db()
+    load_noise_words()
+    load_keywords()
+    _WORKER_PIPELINE = FinancialPipeline(input_path="", output_path="", decimal=decimal, memo_size=memo_size,
+                                         merchant_cache=merchant_cache, merchant_cache_size=merchant_cache_size,
+                                         max_error_samples=max_error_samples)
+
+def _normalize_shard_in_worker(shard: Tuple[int, int], mapping: Dict[str, str], path: Path,
+                               columns: List[str]) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, Dict[str, Tuple[int, int]], Dict]:
+    '''
+    Pool task: parse one byte range of the mapped input, then normalize it like any other chunk
+    '''
+    start, end = shard
+    began = time.perf_counter()
+    raw_df = read_shard(path, start, end, columns)
+    return _normalize_in_worker(raw_df, mapping, load_seconds=time.perf_counter() - began)
+
+def _normalize_file_in_worker(task: Tuple[pd.DataFrame, Dict[str, str]]) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, Dict[str, Tuple[int, int]], Dict]:
+    '''
+    Pool task: normalize one whole file of a batch with its own column mapping
+    '''
+    raw_df, mapping = task
+    return _normalize_in_worker(raw_df, mapping)
+
+def _normalize_in_worker(raw_df: pd.DataFrame, mapping: Dict[str, str],
+                         load_seconds: Optional[float] = None) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, Dict[str, Tuple[int, int]], Dict]:
+    '''
+    Pool task: normalize one chunk with the worker's warm pipeline and report the memo hits/misses and
+    stage metrics it caused (load_seconds is the time the task spent parsing its own input)
+    '''
+    caches = _WORKER_PIPELINE.counted_caches()
+    before = {name: (cache.hits, cache.misses) for name, cache in caches.items()}
+    _WORKER_PIPELINE.metrics = StageMetrics()
+    if load_seconds is not None:
+        _WORKER_PIPELINE.metrics.add("load", load_seconds, len(raw_df))
 
-        self.generate_report(clean_df)
\ No newline at end of file
+    clean_df, error_df, failures = _WORKER_PIPELINE.normalize_chunk(raw_df, mapping)
+    memo_counts = {
+        name: (cache.hits - before[name][0], cache.misses - before[name][1])
+        for name, cache in caches.items()
+    }
+    return clean_df, error_df, failures, memo_counts, _WORKER_PIPELINE.metrics.state()
@@ -0,0 +1,140 @@
+import queue
+import threading
+import time
+from typing import Callable, Iterable, Iterator, Optional
+
+from src.metrics import StageMetrics
+
+# Chunks buffered between two pipelined stages; with one queue on each side of normalization,
+# at most about 2 * QUEUE_DEPTH + 3 chunks are alive at once
+QUEUE_DEPTH = 2
+
+# How often a blocked put/get re-checks whether the other side has stopped
+POLL_SECONDS = 0.1
+
+_DONE = object()
+
+class _Failure:
+    '''
+    Exception raised inside a stage thread, handed across the queue to be re-raised on the other side
+    '''
+
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+def _put(channel: queue.Queue, item, stop: threading.Event) -> bool:
+    '''
+    Blocking put that gives up (returning False) once stop is set, so a stage never hangs on a dead consumer
+    '''
+    while not stop.is_set():
+        try:
+            channel.put(item, timeout=POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def prefetch(items: Iterable, metrics: StageMetrics, producer: str, consumer: str,
+             depth: int = QUEUE_DEPTH) -> Iterator:
+    '''
+    Produce items in a background thread, at most depth ahead of the consumer, and yield them in order.
+    Time the producer spends on a full queue is recorded as wait.<producer>_blocked, time the consumer
+    spends on an empty one as wait.<consumer>_starved. Producer errors are re-raised in the consumer.
+    '''
+    channel = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def produce() -> None:
+        try:
+            for item in items:
+                began = time.perf_counter()
+                if not _put(channel, item, stop):
+                    return
+                metrics.add(f"wait.{producer}_blocked", time.perf_counter() - began)
+            _put(channel, _DONE, stop)
+        except BaseException as e:
+            _put(channel, _Failure(e), stop)
+
+    thread = threading.Thread(target=produce, name=f"{producer}-stage", daemon=True)
+    thread.start()
+    try:
+        while True:
+            began = time.perf_counter()
+            item = channel.get()
+            metrics.add(f"wait.{consumer}_starved", time.perf_counter() - began)
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        # Reached on normal exit too; an abandoned producer stops at its next put
+        stop.set()
+        thread.join()
+
+class BackgroundConsumer:
+    '''
+    Runs handle(item) for every put item, in order, on its own thread behind a bounded queue.
+    Time the caller spends on a full queue is recorded as wait.<producer>_blocked, time the thread spends
+    on an empty one as wait.<consumer>_starved. A handler error stops the thread and is re-raised by the
+    next put() or by close().
+    '''
+
+    def __init__(self, handle: Callable, metrics: StageMetrics, producer: str, consumer: str,
+                 depth: int = QUEUE_DEPTH) -> None:
+        self.handle = handle
+        self.metrics = metrics
+        self.producer = producer
+        self.consumer = consumer
+        self.channel = queue.Queue(maxsize=depth)
+        self.stop = threading.Event()
+        self.error: Optional[BaseException] = None
+        self.thread = threading.Thread(target=self._consume, name=f"{consumer}-stage", daemon=True)
+        self.thread.start()
+
+    def _consume(self) -> None:
+        while True:
+            began = time.perf_counter()
+            item = self.channel.get()
+            self.metrics.add(f"wait.{self.consumer}_starved", time.perf_counter() - began)
+            if item is _DONE or self.stop.is_set():
+                return
+            try:
+                self.handle(item)
+            except BaseException as e:
+                self.error = e
+                self.stop.set()
+                return
+
+    def put(self, item) -> None:
+        '''
+        Queue one item for the consumer thread, blocking while the queue is full
+        '''
+        began = time.perf_counter()
+        if not _put(self.channel, item, self.stop):
+            self.close()
+        self.metrics.add(f"wait.{self.producer}_blocked", time.perf_counter() - began)
+
+    def close(self, abort: bool = False) -> None:
+        '''
+        Wait for every queued item to be handled (abort=True drops them instead) and re-raise a handler error
+        '''
+        if abort:
+            self.stop.set()
+        if not self.stop.is_set():
+            _put(self.channel, _DONE, self.stop)
+        else:
+            # Unblock a consumer waiting on an empty queue; it exits on _DONE or has already returned
+            try:
+                self.channel.put_nowait(_DONE)
+            except queue.Full:
+                pass
+        self.thread.join()
+        if self.error is not None and not abort:
+            raise self.error
+
+    def __enter__(self) -> "BackgroundConsumer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close(abort=exc_type is not None)
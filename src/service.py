@@ -0,0 +1,180 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+import pandas as pd
+
+from src.pipeline import FinancialPipeline
+from src.formats import FORMATS, render_csv_frame
+from src.normalization.memo import DEFAULT_MEMO_SIZE
+from src.normalization.merchants import load_merchant_db, load_noise_words
+from src.normalization.categories import load_keywords
+from src.normalization.snapshot import reset_config
+from src.merchant_cache import DEFAULT_MAX_ENTRIES
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Upper bound on a request body; larger batches should be sent as a file path
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+class NormalizationService:
+    '''
+    One warm FinancialPipeline shared by every request: config, matchers and memo caches are loaded once and reused.
+    Normalization and reloads are serialized by a lock, since the memo caches and config globals are not thread-safe:
+    one normalization runs at a time, while request parsing, file loading and response encoding run concurrently.
+    Run several service processes behind a load balancer to normalize in parallel.
+    '''
+
+    def __init__(self, decimal: str = '.', memo_size: int = DEFAULT_MEMO_SIZE, merchant_cache: Optional[str] = None,
+                 merchant_cache_size: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.pipeline = FinancialPipeline(input_path="", output_path="", decimal=decimal, memo_size=memo_size,
+                                          merchant_cache=merchant_cache, merchant_cache_size=merchant_cache_size,
+                                          verbose=False)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.load_config()
+
+    def load_config(self) -> None:
+        '''
+        Load merchant, noise-word and keyword config (from the snapshot when it is fresh)
+        '''
+        load_merchant_db()
+        load_noise_words()
+        load_keywords()
+
+    def reload(self) -> None:
+        '''
+        Re-read the config files and drop every result computed under the old config
+        '''
+        with self.lock:
+            reset_config()
+            self.load_config()
+            for cache in self.pipeline.memo.values():
+                cache.clear()
+            if self.pipeline.merchant_cache is not None:
+                self.pipeline.merchant_cache.check_config()
+        self.pipeline.log("Config reloaded")
+
+    def load_rows(self, payload: Dict) -> pd.DataFrame:
+        '''
+        Raw string frame for a request: inline "rows" (a list of objects) or a "path" to read from disk
+        '''
+        if "rows" in payload:
+            rows = payload["rows"]
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                raise ValueError("'rows' must be a list of objects")
+            # JSON numbers arrive typed; normalize() turns every value back into the text a CSV export would hold
+            return pd.DataFrame(rows)
+
+        if "path" in payload:
+            input_format = payload.get("input_format", "csv")
+            if input_format not in FORMATS:
+                raise ValueError(f"Unsupported format: {input_format!r}")
+            reader = FinancialPipeline(input_path=payload["path"], input_format=input_format, verbose=False)
+            return reader.load_data()
+
+        raise ValueError("Request needs either 'rows' or 'path'")
+
+    def normalize(self, payload: Dict) -> Dict:
+        '''
+        Normalize one batch and return its clean rows, error records and counts as JSON-ready values
+        '''
+        raw_df = self.load_rows(payload)
+        with self.lock:
+            clean_df, error_df, _ = self.pipeline.normalize(raw_df, payload.get("mapping"))
+            self.requests += 1
+
+        return {
+            "rows": render_csv_frame(clean_df).to_dict(orient="records"),
+            "errors": error_df.to_dict(orient="records"),
+            "stats": {"total_rows": len(raw_df), "success_rows": len(clean_df), "failed_rows": len(error_df)},
+        }
+
+    def health(self) -> Dict:
+        '''
+        Liveness plus request count and cache counters
+        '''
+        with self.lock:
+            caches = {name: cache.stats() for name, cache in self.pipeline.counted_caches().items()}
+            return {"status": "ok", "requests": self.requests, "caches": caches}
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    '''
+    JSON over HTTP: POST /normalize, POST /reload, GET /health
+    '''
+
+    server_version = "SmartFinancialParser"
+
+    def send_json(self, status: int, body: Dict) -> None:
+        '''
+        Encode and send one JSON response
+        '''
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_json(self) -> Dict:
+        '''
+        Decode the request body; an empty body is an empty object
+        '''
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError(f"Request body exceeds {MAX_BODY_BYTES} bytes; send a 'path' instead")
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(payload, dict):
+            raise ValueError("Request body must be a JSON object")
+        return payload
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self.send_json(200, self.server.service.health())
+        else:
+            self.send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+
+    def do_POST(self) -> None:
+        service = self.server.service
+        try:
+            if self.path == "/normalize":
+                self.send_json(200, service.normalize(self.read_json()))
+            elif self.path == "/reload":
+                service.reload()
+                self.send_json(200, {"status": "reloaded"})
+            else:
+                self.send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+        except FileNotFoundError as e:
+            self.send_json(404, {"error": str(e)})
+        except ValueError as e:
+            # Also covers malformed JSON (json.JSONDecodeError is a ValueError)
+            self.send_json(400, {"error": str(e)})
+        except Exception as e:
+            self.send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+def make_server(service: NormalizationService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    '''
+    Threaded HTTP server bound to host:port (port 0 picks a free one) that serves the given warm service
+    '''
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+def serve(service: NormalizationService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+    '''
+    Serve requests until interrupted
+    '''
+    server = make_server(service, host, port)
+    host, port = server.server_address[:2]
+    print(f"Normalization service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if service.pipeline.merchant_cache is not None:
+            service.pipeline.merchant_cache.close()
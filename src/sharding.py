@@ -0,0 +1,123 @@
+import csv
+import io
+import mmap
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+# Quote counting walks the map in blocks so the planner never copies more than this at once
+_SCAN_BLOCK = 1 << 20
+
+def _next_record_start(mm: mmap.mmap, pos: int, in_quotes: bool) -> Tuple[int, bool]:
+    '''
+    From pos (inside or outside a quoted field), return the offset just past the next newline that ends a record.
+    Doubled quotes ("") flip parity twice, so counting '"' is enough for RFC 4180 files.
+    '''
+    size = len(mm)
+    while pos < size:
+        newline = mm.find(b'\n', pos)
+        if newline == -1:
+            return size, in_quotes
+
+        if mm[pos:newline].count(b'"') % 2:
+            in_quotes = not in_quotes
+        pos = newline + 1
+        if not in_quotes:
+            return pos, False
+
+    return size, in_quotes
+
+def _quote_parity(mm: mmap.mmap, start: int, end: int) -> bool:
+    '''
+    Whether an odd number of quote characters lies in [start, end), scanning block by block.
+    '''
+    odd = False
+    for block_start in range(start, end, _SCAN_BLOCK):
+        if mm[block_start:min(block_start + _SCAN_BLOCK, end)].count(b'"') % 2:
+            odd = not odd
+    return odd
+
+def read_header(path: Path) -> Tuple[List[str], int]:
+    '''
+    Parse only the header record; return the column names and the byte offset where data rows start.
+    '''
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data_start, _ = _next_record_start(mm, 0, False)
+        header = pd.read_csv(io.BytesIO(mm[:data_start]), nrows=0, dtype=str)
+
+    return list(header.columns), data_start
+
+def last_record_end(path: Path, start: int, field_count: Optional[int] = None) -> int:
+    '''
+    Offset just past the last complete record after start: a newline outside quotes. A trailing line
+    without a newline counts as complete when it has field_count fields and no open quote; otherwise it
+    (like an unterminated quoted field) is treated as still being written.
+    '''
+    with open(path, 'rb') as f:
+        size = f.seek(0, 2)
+        if size <= start:
+            return start
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = mm.rfind(b'\n', start) + 1
+            odd = end > start and _quote_parity(mm, start, end)
+            if not odd and field_count is not None and _complete_tail(mm[max(end, start):size], field_count):
+                return size
+            # Walk back line by line until the cut no longer falls inside a quoted field
+            while odd and end > start:
+                previous = mm.rfind(b'\n', start, end - 1) + 1
+                previous = max(previous, start)
+                if mm[previous:end].count(b'"') % 2:
+                    odd = not odd
+                end = previous
+
+    return max(end, start)
+
+def _complete_tail(tail: bytes, field_count: int) -> bool:
+    '''
+    Whether an unterminated last line is a whole record: balanced quotes and exactly field_count fields
+    '''
+    if not tail.strip() or tail.count(b'"') % 2:
+        return False
+    fields = next(csv.reader([tail.decode("utf-8", errors="replace").rstrip("\r")]))
+    return len(fields) == field_count
+
+def plan_shards(path: Path, data_start: int, shard_bytes: int, end: Optional[int] = None) -> List[Tuple[int, int]]:
+    '''
+    Split the data section into roughly shard_bytes byte ranges that start and end on record boundaries.
+    end (a record boundary) stops the plan early, e.g. to leave a partially written last line alone.
+    '''
+    shards = []
+    with open(path, 'rb') as f:
+        size = f.seek(0, 2) if end is None else end
+        if size <= data_start:
+            return [(data_start, data_start)]
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = data_start
+            while start < size:
+                target = min(start + shard_bytes, size)
+                if target >= size:
+                    shards.append((start, size))
+                    break
+
+                # Parity at the target tells us whether it sits inside a quoted (possibly multi-line) field
+                end, _ = _next_record_start(mm, target, _quote_parity(mm, start, target))
+                shards.append((start, end))
+                start = end
+
+    return shards
+
+def read_shard(path: Path, start: int, end: int, columns: List[str]) -> pd.DataFrame:
+    '''
+    Parse one byte range as string columns, the same way load_data parses the whole file.
+    '''
+    if start >= end:
+        return pd.DataFrame(columns=columns, dtype=str)
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        raw = mm[start:end]
+
+    df = pd.read_csv(io.BytesIO(raw), header=None, names=columns, dtype=str)
+    return df.fillna("")
@@ -1,9 +1,19 @@
 import pytest
+import re
 from datetime import date
-from src.normalization.dates import parse_date
-from src.normalization.amounts import parse_amount
-from src.normalization.merchants import parse_merchant
-from src.normalization.categories import assign_category
+import pandas as pd
+from src.normalization.dates import parse_date, parse_date_series, detect_date_formats
+from src.normalization.amounts import parse_amount, parse_amount_series
+from src.normalization import merchants
+from src.normalization.merchants import parse_merchant, parse_merchant_series, resolve_fuzzy, NgramIndex
+from src.normalization.merchants import clean_merchant_name, clean_merchant_names
+from src.normalization import categories
+from src.normalization.categories import assign_category, assign_category_series
+from src.normalization.memo import ValueCache
+from src.merchant_cache import MerchantCache
+from src.normalization import snapshot
+from src.metrics import StageMetrics
+from src.pipelining import BackgroundConsumer, prefetch
 
 class TestDates:
     def test_iso_format(self):
@@ -32,6 +42,30 @@ class TestDates:
         assert parse_date("Not a date") is None
         assert parse_date("") is None
 
+class TestDateSeries:
+    VALUES = ["2025-01-12", "2025-01-4", "01/01/25", "07/16/70", "Feb 26, 2025", "06-Dec-2025",
+              "2025.10.22", "Sept. 3rd, 2024", "2025/13/01", "2025-02-30", "13/01/2025", "Not a date", ""]
+
+    def test_matches_scalar_parser(self):
+        values = pd.Series(self.VALUES * 3)
+        expected = values.map(parse_date).tolist()
+        assert parse_date_series(values).tolist() == expected
+
+    def test_two_digit_year_follows_dateutil_window(self):
+        assert parse_date_series(pd.Series(["07/16/70"]))[0] == parse_date("07/16/70")
+
+    def test_years_below_100_match_scalar_parser(self):
+        values = pd.Series(["Jan 01, 0099", "0099-01-01", "01/02/0050", "12-Mar-0005", "0100-01-01"])
+        assert parse_date_series(values).tolist() == values.map(parse_date).tolist()
+
+    def test_detects_dominant_formats(self):
+        values = pd.Series(["2025-01-12"] * 90 + ["Feb 26, 2025"] * 10)
+        assert detect_date_formats(values) == ["%Y-%m-%d", "%b %d, %Y"]
+
+    def test_failures_are_none(self):
+        result = parse_date_series(pd.Series(["", "2025/13/01", "Not a date"]))
+        assert result.isna().all()
+
 class TestAmounts:
     def test_clean_currency(self):
         assert parse_amount("$100.00") == 100.0
@@ -55,6 +89,27 @@ class TestAmounts:
         assert parse_amount("N/A") is None
         assert parse_amount("") is None
 
+    def test_european_format(self):
+        assert parse_amount("1.234,56", decimal=",") == 1234.56
+        assert parse_amount("(1.234,56 €)", decimal=",") == -1234.56
+
+class TestAmountSeries:
+    VALUES = ["$100.00", "1,000.00", "1 000.00", "50.00 USD", "USD 50.00", "(500.00)", "-500.00",
+              "(-5)", "٣.5", "Free", "N/A", "", "-", "1.2.3"]
+
+    def test_matches_scalar_parser(self):
+        result = parse_amount_series(pd.Series(self.VALUES))
+        for raw, value in zip(self.VALUES, result):
+            expected = parse_amount(raw)
+            assert (pd.isna(value) and expected is None) or value == expected
+
+    def test_european_format(self):
+        result = parse_amount_series(pd.Series(["1.234,56", "€ 12,50", "(1.000,00)"]), decimal=",")
+        assert result.tolist() == [1234.56, 12.5, -1000.0]
+
+    def test_failures_are_nan(self):
+        assert parse_amount_series(pd.Series(["Free", ""])).isna().all()
+
 class TestMerchants:
     def test_basic_cleaning(self):
         assert parse_merchant("  uber   ") == "UBER"
@@ -113,6 +168,68 @@ class TestMerchants:
     def test_hyphenated_brands(self):
         assert parse_merchant("CHICK-FIL-A") == "CHICK-FIL-A"
 
+class TestMerchantCleaning:
+    VALUES = ["UBER *TRIP", "WWW.AMAZON.COM", "Amazon.com Inc.", "US-CO TRADING", "USA TODAY", "AT&T",
+              "Chick_Fil_A LLC", "ÉCOLE CO", "Straße Corp", "Starbucks ☕️", "  \tTABS\tAND  SPACES ", "INCO", ""]
+
+    @staticmethod
+    def reference_clean(raw: str) -> str:
+        # The original word-by-word implementation, kept as the oracle
+        s = raw.upper().strip()
+        for separator in ['*', '.', '_']:
+            s = s.replace(separator, ' ')
+        for noise_word in merchants._NOISE_WORDS:
+            s = re.sub(r'\b' + noise_word + r'\b', '', s)
+        s = re.sub(r'[^A-Z0-9\s]', '', s)
+        return " ".join(s.split())
+
+    def test_noise_words_come_from_config(self):
+        merchants.load_noise_words()
+        assert "LLC" in merchants._NOISE_WORDS and "TECHNOLOGIES" in merchants._NOISE_WORDS
+
+    def test_matches_word_by_word_removal(self):
+        expected = [self.reference_clean(value) for value in self.VALUES]
+        assert [clean_merchant_name(value) for value in self.VALUES] == expected
+        assert clean_merchant_names(pd.Series(self.VALUES)).tolist() == expected
+
+class TestMerchantBatch:
+    VALUES = ["  uber   ", "AMAZON", "UBER *TRIP", "Uber Technologies", "AMZN Mktp US", "Starbucks ☕️",
+              "Joe's Coffee", "", "WMT SUPERCENTER", "AWS", "TGIF DINING", "HOME DEPOT", "OFFICE DEPOT",
+              "BP GAS", "WWW.AMAZON.COM", "NETFLIX.COM", "CHICK-FIL-A"]
+
+    def test_matches_single_row_path(self):
+        result = parse_merchant_series(pd.Series(self.VALUES))
+        assert result.tolist() == [parse_merchant(value) for value in self.VALUES]
+
+    def test_fuzzy_resolver_returns_none_below_cutoff(self):
+        assert resolve_fuzzy(["UBER TRIP", "JOES COFFEE"]) == ["UBER", None]
+
+    def test_cdist_path_matches_extract_one(self, monkeypatch):
+        names = ["UBER TRIP", "JOES COFFEE", "HOME DEPOTT", "STARBUKS"] * 3
+        expected = resolve_fuzzy(names)
+        monkeypatch.setattr(merchants, "FUZZY_CDIST_MIN_NAMES", 0)
+        monkeypatch.setattr(merchants, "_fuzzy_threads", lambda: 2)
+        assert resolve_fuzzy(names) == expected
+
+    def test_non_string_is_unknown(self):
+        assert parse_merchant_series(pd.Series([None], dtype=object)).tolist() == ["UNKNOWN"]
+
+class TestMerchantIndex:
+    def test_candidates_include_close_names(self):
+        names = ["HOME DEPOT", "OFFICE DEPOT", "STARBUCKS", "SHELL"]
+        index = NgramIndex(names)
+        assert [names[i] for i in index.candidates("HOME DEPOT 123", limit=1)] == ["HOME DEPOT"]
+
+    def test_candidates_keep_config_order(self):
+        index = NgramIndex(["UBER EATS", "UBER", "LYFT"])
+        assert index.candidates("UBER", limit=2).tolist() == [0, 1]
+
+    def test_indexed_resolution_matches_brute_force(self, monkeypatch):
+        merchants.load_merchant_db()
+        expected = [parse_merchant(value) for value in TestMerchantBatch.VALUES]
+        monkeypatch.setattr(merchants, "_FUZZY_INDEX", NgramIndex(merchants._CANONICAL_NAMES))
+        assert parse_merchant_series(pd.Series(TestMerchantBatch.VALUES)).tolist() == expected
+
 class TestCategories:
     def test_fallback_dining_keyword(self):
         assert assign_category("LOCAL COFFEE HOUSE") == "Dining"
@@ -166,4 +283,172 @@ class TestCategories:
         assert assign_category("CHASE") == "Finance"
 
     def test_canonical_unconventional_category(self):
-        assert assign_category("AMAZON") == "Shopping"
\ No newline at end of file
+        assert assign_category("AMAZON") == "Shopping"
+
+class TestValueCache:
+    def test_normalizes_each_distinct_value_once(self):
+        seen = []
+        cache = ValueCache("upper", lambda values: seen.extend(values) or values.str.upper())
+        result = cache.map(pd.Series(["a", "b", "a", "a"]))
+        assert result.tolist() == ["A", "B", "A", "A"]
+        assert seen == ["a", "b"]
+        assert cache.stats() == {"hits": 2, "misses": 2, "size": 2}
+
+    def test_lru_carries_across_batches(self):
+        cache = ValueCache("upper", lambda values: values.str.upper())
+        cache.map(pd.Series(["a"]))
+        cache.map(pd.Series(["a", "b"]))
+        assert cache.hits == 1 and cache.misses == 2
+
+    def test_lru_is_bounded(self):
+        cache = ValueCache("upper", lambda values: values.str.upper(), maxsize=2)
+        cache.map(pd.Series(["a", "b", "c"]))
+        assert cache.stats()["size"] == 2
+        cache.map(pd.Series(["a"]))
+        assert cache.misses == 4
+
+    def test_preserves_index(self):
+        cache = ValueCache("date", parse_date_series)
+        result = cache.map(pd.Series(["2025-01-12", ""], index=[10, 20]))
+        assert result.index.tolist() == [10, 20]
+        assert result[10] == date(2025, 1, 12) and result[20] is None
+
+
+class TestMerchantCache:
+    VALUES = ["UBER *TRIP", "Starbucks Coffee #123", "AMZN Mktp US", "Joe's Unknown Diner", "", "UBER *TRIP"]
+
+    def test_matches_uncached_resolution_and_persists(self, tmpdir):
+        values = pd.Series(self.VALUES)
+        expected_merchants = parse_merchant_series(values)
+        expected_categories = assign_category_series(expected_merchants)
+
+        cache = MerchantCache(str(tmpdir / "merchants.sqlite"))
+        for _ in range(2):
+            names, categories_found = cache.resolve(values)
+            assert names.tolist() == expected_merchants.tolist()
+            assert categories_found.tolist() == expected_categories.tolist()
+        assert cache.stats() == {"hits": 5, "misses": 5, "size": 4}
+
+        reopened = MerchantCache(str(tmpdir / "merchants.sqlite"))
+        reopened.resolve(values)
+        assert reopened.hits == 5 and reopened.misses == 0
+
+    def test_evicts_least_recently_used(self, tmpdir):
+        cache = MerchantCache(str(tmpdir / "merchants.sqlite"), max_entries=2)
+        cache.resolve(pd.Series(["SHELL OIL"]))
+        cache.resolve(pd.Series(["STARBUCKS", "UBER"]))
+        assert cache.stats()["size"] == 2
+        assert set(cache.lookup(["SHELL OIL", "STARBUCKS", "UBER"])) == {"STARBUCKS", "UBER"}
+
+    def test_cleared_when_keywords_change(self, tmpdir, monkeypatch):
+        keywords_path = tmpdir / "keywords.csv"
+        keywords_path.write_text(categories.KEYWORDS_FILE.read_text(), encoding="utf-8")
+        monkeypatch.setattr(categories, "KEYWORDS_FILE", keywords_path)
+
+        MerchantCache(str(tmpdir / "merchants.sqlite")).resolve(pd.Series(["SHELL OIL"]))
+        assert MerchantCache(str(tmpdir / "merchants.sqlite")).stats()["size"] == 1
+
+        with open(keywords_path, "a", encoding="utf-8") as f:
+            f.write("Gas,PETROL\n")
+        with pytest.warns(UserWarning, match="Merchant config changed"):
+            assert MerchantCache(str(tmpdir / "merchants.sqlite")).stats()["size"] == 0
+
+
+class TestConfigSnapshot:
+    @pytest.fixture
+    def keywords_path(self, tmpdir, monkeypatch):
+        path = tmpdir / "keywords.csv"
+        path.write_text(categories.KEYWORDS_FILE.read_text(), encoding="utf-8")
+        monkeypatch.setattr(categories, "KEYWORDS_FILE", path)
+        snapshot.reset_config()
+        yield path
+        # Runs before monkeypatch restores the path, so later tests reload the real config
+        snapshot.reset_config()
+
+    def test_restores_the_same_config(self, tmpdir, keywords_path):
+        expected = (parse_merchant("AMZN Mktp US"), assign_category("Joe's Pizza Kitchen"), list(merchants._CANONICAL_NAMES))
+        snapshot_path = snapshot.compile_config(tmpdir / "config.pkl")
+
+        snapshot.reset_config()
+        assert snapshot.restore_snapshot(snapshot_path)
+        assert (parse_merchant("AMZN Mktp US"), assign_category("Joe's Pizza Kitchen"), merchants._CANONICAL_NAMES) == expected
+
+    def test_stale_snapshot_falls_back_to_csv(self, tmpdir, keywords_path):
+        snapshot_path = snapshot.compile_config(tmpdir / "config.pkl")
+
+        # Touching a source without changing it keeps the snapshot usable
+        keywords_path.write_text(keywords_path.read_text(encoding="utf-8"), encoding="utf-8")
+        snapshot.reset_config()
+        assert snapshot.restore_snapshot(snapshot_path)
+
+        with open(keywords_path, "a", encoding="utf-8") as f:
+            f.write("\nDining,RAMEN\n")
+        snapshot.reset_config()
+        with pytest.warns(UserWarning, match="stale"):
+            assert not snapshot.restore_snapshot(snapshot_path)
+        assert assign_category("TOKYO RAMEN") == "Dining"
+
+
+class TestCategorySeries:
+    VALUES = ["LOCAL COFFEE HOUSE", "SARAH'S DELI AND SANDWICHES", "PETRO FUEL STOP", "JOE'S AUTOMOTIVE REPAIR",
+              "CITY OF SPRINGFIELD WATER", "DR. SMITH DENTAL", "CAR WASH AND GAS", "TITAN", "  starbucks ",
+              "UBER", "GENERAL MERCHANDISE WAREHOUSE", ""]
+
+    @staticmethod
+    def reference_category(name: str) -> str:
+        # The original per-keyword loop, kept as the oracle for priority and word-boundary semantics
+        if not name:
+            return categories.DEFAULT_CATEGORY
+        clean_name = name.upper().strip()
+        categories.load_keywords()
+        canonical_map = categories.get_category_map()
+        if clean_name in canonical_map:
+            return canonical_map[clean_name]
+        for keyword, category in categories._KEYWORD_RULES.items():
+            if re.search(r'\b' + re.escape(keyword) + r'\b', clean_name):
+                return category
+        return categories.DEFAULT_CATEGORY
+
+    def test_matches_per_keyword_loop(self):
+        expected = [self.reference_category(name) for name in self.VALUES]
+        assert [assign_category(name) for name in self.VALUES] == expected
+        assert assign_category_series(pd.Series(self.VALUES)).tolist() == expected
+
+    def test_priority_follows_config_order(self):
+        # STATION (Gas) is listed before TRAIN (Transport) even though TRAIN appears first in the name
+        assert assign_category("TRAIN STATION") == "Gas"
+
+    def test_word_boundaries(self):
+        assert assign_category("TITAN") == "Miscellaneous"
+
+class TestPipelining:
+    def test_prefetch_keeps_order_and_records_waits(self):
+        metrics = StageMetrics()
+        assert list(prefetch(range(50), metrics, "reader", "normalize", depth=2)) == list(range(50))
+        assert metrics.stages["wait.normalize_starved"]["calls"] == 51
+        assert "wait.reader_blocked" in metrics.stages
+
+    def test_prefetch_reraises_producer_errors(self):
+        def items():
+            yield 1
+            raise OSError("disk gone")
+
+        with pytest.raises(OSError, match="disk gone"):
+            list(prefetch(items(), StageMetrics(), "reader", "normalize"))
+
+    def test_consumer_handles_items_in_order(self):
+        seen = []
+        with BackgroundConsumer(seen.append, StageMetrics(), "normalize", "writer", depth=1) as sink:
+            for item in range(100):
+                sink.put(item)
+        assert seen == list(range(100))
+
+    def test_consumer_error_reaches_producer(self):
+        def handle(item):
+            if item == 3:
+                raise ValueError("cannot write")
+
+        with pytest.raises(ValueError, match="cannot write"):
+            with BackgroundConsumer(handle, StageMetrics(), "normalize", "writer", depth=1) as sink:
+                for item in range(1000):
+                    sink.put(item)
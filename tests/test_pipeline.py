@@ -1,5 +1,16 @@
+import gzip
+import json
+import subprocess
+import sys
+import threading
+import urllib.error
+import urllib.request
+import pytest
 import pandas as pd
-from src.pipeline import FinancialPipeline
+from src.pipeline import FinancialPipeline, PipelineError, normalize
+from src.formats import render_csv_frame
+from src.service import NormalizationService, make_server
+from scripts import benchmark_suite, generate_chaos
 from pathlib import Path
 from shutil import copyfile
 
@@ -28,3 +39,642 @@ def test_pipeline_integration(tmpdir):
         expected_df.reset_index(drop=True),
         check_dtype=False
     )
+
+def test_batch_matches_row_path(tmpdir):
+    pipeline = FinancialPipeline(
+        input_path=str(INPUT_FILE),
+        output_path=str(Path(tmpdir) / "unused.csv")
+    )
+    raw_df = pipeline.load_data()
+    col_map = pipeline.map_columns(raw_df)
+
+    clean_rows, error_rows = [], []
+    for _, row in raw_df.iterrows():
+        success_data, error_data = pipeline.process_row(row, col_map)
+        if success_data:
+            clean_rows.append(success_data)
+        else:
+            error_rows.append(error_data)
+
+    clean_df, failed, reasons = pipeline.process_batch(raw_df, col_map)
+    error_df = pipeline.render_error_reasons(pipeline.build_error_records(raw_df, pipeline.failure_codes(col_map, failed, reasons)))
+
+    assert int(failed.sum()) == len(error_rows)
+    assert set(reasons.dropna()) == {"INVALID_DATE", "MISSING_DATE", "MISSING_AMOUNT"}
+    pd.testing.assert_frame_equal(render_csv_frame(clean_df).reset_index(drop=True), pd.DataFrame(clean_rows), check_dtype=False)
+    # Error codes are categorical in the batch path and plain strings in the row path
+    pd.testing.assert_frame_equal(error_df.reset_index(drop=True).astype(object), pd.DataFrame(error_rows).astype(object), check_dtype=False)
+
+def test_clean_frame_is_typed(tmpdir):
+    pipeline = FinancialPipeline(
+        input_path=str(INPUT_FILE),
+        output_path=str(Path(tmpdir) / "unused.csv")
+    )
+    raw_df = pipeline.load_data()
+    clean_df, _, _ = pipeline.process_batch(raw_df, pipeline.map_columns(raw_df))
+
+    assert str(clean_df["Date"].dtype) == "datetime64[s]"
+    assert clean_df["Merchant"].dtype == "category" and clean_df["Category"].dtype == "category"
+    assert clean_df["Amount"].dtype == "int64"
+
+    old = pd.DataFrame({"Date": ["0099-03-01", "2024-02-29"], "Merchant": ["A", "B"], "Amount": ["1.005", "-0.10"]})
+    clean_df, _, _ = pipeline.process_batch(old, {"date": "Date", "merchant": "Merchant", "amount": "Amount"})
+    output = render_csv_frame(clean_df)
+    assert output["Date"].tolist() == ["0099-03-01", "2024-02-29"]
+    assert clean_df["Amount"].tolist() == [101, -10]
+
+def test_half_cents_round_away_from_zero_and_huge_amounts_fail(tmpdir):
+    pipeline = FinancialPipeline(input_path=str(INPUT_FILE), output_path=str(Path(tmpdir) / "unused.csv"))
+    mapping = {"date": "Date", "merchant": "Merchant", "amount": "Amount"}
+    amounts = ["0.005", "0.015", "-0.005", "2.675", "99999999999999999999", "-90071992547409.93", "90071992547409.91"]
+    raw_df = pd.DataFrame({"Date": "2024-01-02", "Merchant": "A", "Amount": amounts})
+
+    clean_df, failed, reasons = pipeline.process_batch(raw_df, mapping)
+    assert clean_df["Amount"].tolist() == [1, 2, -1, 268, 9007199254740991]
+    assert reasons[failed].tolist() == ["AMOUNT_OUT_OF_RANGE", "AMOUNT_OUT_OF_RANGE"]
+    assert [pipeline.process_row(row, mapping)[1] is not None for _, row in raw_df.iterrows()] == failed.tolist()
+
+def run_pipeline(tmpdir, name, **options):
+    output_path = Path(tmpdir) / name / "normalized.csv"
+    pipeline = FinancialPipeline(input_path=str(INPUT_FILE), output_path=str(output_path), **options)
+    pipeline.run()
+    return pipeline
+
+def test_chunked_run_matches_full_run(tmpdir):
+    full = run_pipeline(tmpdir, "full")
+    chunked = run_pipeline(tmpdir, "chunked", chunksize=7)
+
+    assert chunked.output_path.read_text() == full.output_path.read_text()
+    assert chunked.error_path.read_text() == full.error_path.read_text()
+    for key in ["total_rows", "success_rows", "failed_rows", "top_category"]:
+        assert chunked.stats[key] == full.stats[key]
+    assert round(chunked.stats["total_spend"], 2) == round(full.stats["total_spend"], 2)
+
+def test_worker_pool_matches_serial_run(tmpdir):
+    serial = run_pipeline(tmpdir, "serial")
+    pooled = run_pipeline(tmpdir, "pooled", workers=2)
+    pooled_chunks = run_pipeline(tmpdir, "pooled_chunks", workers=2, chunksize=10)
+
+    for pipeline in [pooled, pooled_chunks]:
+        assert pipeline.output_path.read_text() == serial.output_path.read_text()
+        assert pipeline.error_path.read_text() == serial.error_path.read_text()
+        assert pipeline.stats["failed_rows"] == serial.stats["failed_rows"]
+        assert pipeline.stats["top_category"] == serial.stats["top_category"]
+    assert pooled.stats["total_spend"] == serial.stats["total_spend"]
+    assert sum(cache.misses for cache in pooled.memo.values()) > 0
+
+    # Worker caches split hits and misses differently, so the quality report leaves them out
+    pooled_three = run_pipeline(tmpdir, "pooled_three", workers=3)
+    for name, pipeline in [("pooled", pooled), ("pooled_chunks", pooled_chunks), ("pooled_three", pooled_three)]:
+        report = pipeline.report_path.read_text().replace(str(Path(tmpdir) / name), str(Path(tmpdir) / "serial"))
+        assert report == serial.report_path.read_text()
+
+def test_pipelined_run_matches_serial_run(tmpdir):
+    serial = run_pipeline(tmpdir, "serial", chunksize=7)
+    for name, options in [("pipelined", {}), ("pipelined_pool", {"workers": 2})]:
+        pipeline = run_pipeline(tmpdir, name, chunksize=7, pipelined=True, **options)
+        assert pipeline.output_path.read_text() == serial.output_path.read_text()
+        assert pipeline.error_path.read_text() == serial.error_path.read_text()
+        assert pipeline.stats == serial.stats
+
+    stages = json.loads(pipeline.metrics_path.read_text())["stages"]
+    for name in ["wait.reader_blocked", "wait.normalize_starved", "wait.normalize_blocked", "wait.writer_starved"]:
+        assert name in stages
+
+def test_error_samples_are_capped_per_code(tmpdir):
+    input_path = Path(tmpdir) / "bad_feed.csv"
+    generate_chaos.create_chaos_file(input_path, 2000, options=generate_chaos.default_options(error_rate=0.5), edge_cases=False)
+
+    runs = {}
+    for name, options in [("plain", {}), ("projected", {"chunksize": 300, "project_columns": True}),
+                          ("pipelined", {"chunksize": 300, "pipelined": True, "workers": 2})]:
+        runs[name] = FinancialPipeline(input_path=str(input_path), output_path=str(Path(tmpdir) / name / "normalized.csv"),
+                                       max_error_samples=5, **options)
+        runs[name].run()
+
+    plain = runs["plain"]
+    errors = pd.read_csv(plain.error_path, dtype=str, keep_default_na=False)
+    assert (errors["Error_Code"].value_counts() == 5).all() and len(errors) == 20
+    assert plain.stats["failed_rows"] > 500
+    assert sum(error["count"] for error in plain.build_report()["errors"]) == plain.stats["failed_rows"]
+    for pipeline in runs.values():
+        assert pipeline.error_path.read_text() == plain.error_path.read_text()
+        assert pipeline.error_counts == plain.error_counts
+
+    report = plain.report_path.read_text()
+    assert f"Error Samples Logged: 20 of {plain.stats['failed_rows']} (max 5 per type)" in report
+    assert f"Invalid amount [Value]: {plain.error_counts[('INVALID_AMOUNT', 'Value')]}" in report
+
+    # Only sampled failures are expanded into full rows; the failure codes still cover every failed row
+    raw_df = plain.load_data()
+    _, error_df, failures = plain.normalize_chunk(raw_df, plain.map_columns(raw_df))
+    assert len(error_df) == 20 and len(failures) == plain.stats["failed_rows"]
+
+    batch_dir = Path(tmpdir) / "inbox"
+    batch_dir.mkdir()
+    for name in ["a.csv", "b.csv"]:
+        copyfile(input_path, batch_dir / name)
+    batch = FinancialPipeline(input_path=str(batch_dir), output_path=str(Path(tmpdir) / "batch" / "normalized.csv"),
+                              max_error_samples=5, workers=2)
+    batch.run()
+    assert [stats["failed_rows"] for stats in batch.file_stats.values()] == [plain.stats["failed_rows"]] * 2
+    assert len(pd.read_csv(batch.error_path)) == 20
+
+QUOTED_HEADER = 'Trans Date,Description,Value\n'
+QUOTED_ROWS = (
+    '2025-01-02,"UBER\nTRIP",$5.00\n'
+    '2025-01-03,"Joe\'s ""Best"" Coffee, Inc.",$4.50\n'
+    '2025-01-04,"multi\nline\n""quoted""\nvendor",(12.00)\n'
+    'bad date,STARBUCKS,$3.00\n'
+    '2025-01-05,SHELL OIL,\n'
+)
+
+def test_sharded_run_matches_full_run(tmpdir):
+    input_path = Path(tmpdir) / "quoted.csv"
+    input_path.write_text(QUOTED_HEADER + QUOTED_ROWS * 20)
+
+    runs = {}
+    for name, options in {"full": {}, "sharded": {"shard_bytes": 64}, "pooled": {"shard_bytes": 256, "workers": 2}}.items():
+        pipeline = FinancialPipeline(input_path=str(input_path), output_path=str(Path(tmpdir) / name / "out.csv"), **options)
+        pipeline.run()
+        runs[name] = pipeline
+
+    for name in ["sharded", "pooled"]:
+        assert runs[name].output_path.read_text() == runs["full"].output_path.read_text()
+        assert runs[name].error_path.read_text() == runs["full"].error_path.read_text()
+        assert runs[name].stats["total_rows"] == runs["full"].stats["total_rows"] == 100
+
+def test_shards_start_on_record_boundaries(tmpdir):
+    from src.sharding import read_header, plan_shards
+
+    input_path = Path(tmpdir) / "quoted.csv"
+    input_path.write_text(QUOTED_HEADER + QUOTED_ROWS * 5)
+    columns, data_start = read_header(input_path)
+    shards = plan_shards(input_path, data_start, shard_bytes=10)
+
+    assert columns == ["Trans Date", "Description", "Value"]
+    assert shards[0][0] == data_start and shards[-1][1] == input_path.stat().st_size
+    content = input_path.read_bytes()
+    for start, end in shards:
+        assert content[start:end].count(b'"') % 2 == 0
+
+def test_projected_run_keeps_full_error_rows(tmpdir):
+    import io
+    pytest.importorskip("pyarrow")
+
+    raw = pd.read_csv(io.StringIO(QUOTED_HEADER + QUOTED_ROWS * 20), dtype=str)
+    for i in range(5):
+        raw.insert(0, f"Extra {i}", [f"note {i}\nrow {n}" for n in range(len(raw))])
+    input_path = Path(tmpdir) / "wide.csv"
+    raw.to_csv(input_path, index=False)
+
+    runs = {}
+    for name, options in {"full": {}, "projected": {"project_columns": True},
+                          "projected_chunks": {"project_columns": True, "chunksize": 7},
+                          "pyarrow": {"project_columns": True, "engine": "pyarrow"}}.items():
+        pipeline = FinancialPipeline(input_path=str(input_path), output_path=str(Path(tmpdir) / name / "out.csv"), **options)
+        pipeline.run()
+        runs[name] = pipeline
+
+    errors = pd.read_csv(runs["full"].error_path, dtype=str)
+    assert len(errors) == 40 and "Extra 4" in errors.columns
+    for name in ["projected", "projected_chunks", "pyarrow"]:
+        assert runs[name].output_path.read_text() == runs["full"].output_path.read_text()
+        assert runs[name].error_path.read_text() == runs["full"].error_path.read_text()
+
+def test_projection_loads_only_mapped_columns():
+    pipeline = FinancialPipeline(input_path=str(INPUT_FILE), output_path="unused.csv", project_columns=True)
+    col_map = pipeline.map_columns(pipeline.sniff_header())
+    raw_df = pipeline.load_data(pipeline.projected_columns(col_map))
+
+    assert set(raw_df.columns) == set(col_map.values())
+
+def test_partitioned_rerun_replaces_earlier_partitions(tmpdir):
+    root = Path(tmpdir) / "dataset"
+    FinancialPipeline(input_path=str(INPUT_FILE), output_path=str(root), partition=True, chunksize=50).run()
+    (root / "README.txt").write_text("kept")
+
+    small_input = Path(tmpdir) / "small.csv"
+    small_input.write_text("Date,Merchant,Amount\n2031-05-02,UBER,12.50\n")
+    FinancialPipeline(input_path=str(small_input), output_path=str(root), partition=True).run()
+
+    assert sorted(path.relative_to(root).as_posix() for path in root.rglob("*.csv")) == ["year=2031/month=5/part-00000.csv"]
+    assert (root / "README.txt").read_text() == "kept"
+
+def test_columnar_outputs_match_csv(tmpdir):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.dataset
+    import pyarrow.parquet
+
+    csv_run = run_pipeline(tmpdir, "csv")
+    expected = pd.read_csv(csv_run.output_path, dtype=str)
+
+    parquet = run_pipeline(tmpdir, "parquet", output_format="parquet", chunksize=7)
+    arrow = run_pipeline(tmpdir, "arrow", output_format="arrow", chunksize=7)
+    tables = [pyarrow.parquet.read_table(parquet.output_path)]
+    with pa.memory_map(str(arrow.output_path)) as source:
+        tables.append(pa.ipc.open_file(source).read_all())
+
+    for table in tables:
+        assert str(table.schema.field("Amount").type) == "decimal128(18, 2)"
+        assert str(table.schema.field("Date").type) == "date32[day]"
+        assert pa.types.is_dictionary(table.schema.field("Merchant").type)
+        actual = table.to_pandas()
+        assert actual["Date"].astype(str).tolist() == expected["Date"].tolist()
+        assert actual["Merchant"].astype(str).tolist() == expected["Merchant"].tolist()
+        assert [float(amount) for amount in actual["Amount"]] == expected["Amount"].astype(float).tolist()
+
+    partitioned = run_pipeline(tmpdir, "partitioned", output_format="parquet", partition=True, chunksize=50)
+    dataset = pyarrow.dataset.dataset(partitioned.output_path, format="parquet", partitioning="hive")
+    year, month = expected["Date"].iloc[0][:4], expected["Date"].iloc[0][5:7]
+    one_month = dataset.to_table(filter=(pyarrow.dataset.field("year") == int(year)) & (pyarrow.dataset.field("month") == int(month)))
+    assert one_month.num_rows == int(expected["Date"].str.startswith(f"{year}-{month}").sum())
+    assert dataset.count_rows() == len(expected)
+
+def test_compressed_and_columnar_inputs(tmpdir):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    plain = run_pipeline(tmpdir, "plain")
+    raw = pd.read_csv(INPUT_FILE, dtype=str)
+
+    inputs = {"gz": Path(tmpdir) / "in.csv.gz", "zst": Path(tmpdir) / "in.csv.zst", "parquet": Path(tmpdir) / "in.parquet"}
+    raw.to_csv(inputs["gz"], index=False)
+    with pa.CompressedOutputStream(str(inputs["zst"]), "zstd") as stream:
+        stream.write(INPUT_FILE.read_bytes())
+    pyarrow.parquet.write_table(pa.Table.from_pandas(raw, preserve_index=False), inputs["parquet"])
+
+    for name, path in inputs.items():
+        options = {"input_format": "parquet"} if name == "parquet" else {}
+        for chunksize in [None, 9]:
+            output_path = Path(tmpdir) / f"{name}-{chunksize}" / "out.csv.gz"
+            pipeline = FinancialPipeline(input_path=str(path), output_path=str(output_path), chunksize=chunksize, **options)
+            pipeline.run()
+            with gzip.open(output_path, "rt", newline="") as f:
+                assert f.read() == plain.output_path.read_text()
+            assert pipeline.error_path.read_text() == plain.error_path.read_text()
+
+def test_incremental_run_appends_only_new_rows(tmpdir):
+    input_path = Path(tmpdir) / "growing.csv"
+    output_path = Path(tmpdir) / "incremental" / "out.csv"
+
+    def run_incremental():
+        pipeline = FinancialPipeline(input_path=str(input_path), output_path=str(output_path), incremental=True)
+        pipeline.run()
+        return pipeline
+
+    input_path.write_text(QUOTED_HEADER + QUOTED_ROWS * 3)
+    assert run_incremental().stats["total_rows"] == 15
+
+    # A half-written quoted record is left for the next run
+    with open(input_path, "a") as f:
+        f.write(QUOTED_ROWS * 2 + '2025-02-01,"still\nbeing')
+    pipeline = run_incremental()
+    assert pipeline.stats["total_rows"] == 25
+    assert pipeline.memo["date"].hits + pipeline.memo["date"].misses == 10
+
+    with open(input_path, "a") as f:
+        f.write(' written",$1.00\n')
+    incremental = run_incremental()
+
+    full = FinancialPipeline(input_path=str(input_path), output_path=str(Path(tmpdir) / "full" / "out.csv"))
+    full.run()
+    assert incremental.output_path.read_text() == full.output_path.read_text()
+    assert incremental.error_path.read_text() == full.error_path.read_text()
+    for key in ["total_rows", "success_rows", "failed_rows", "top_category", "total_spend"]:
+        assert incremental.stats[key] == full.stats[key]
+    assert incremental.error_counts == full.error_counts
+
+    # Leftovers from a run that died before saving its state are dropped, not duplicated
+    with open(output_path, "a") as f:
+        f.write("2025-01-01,PARTIAL,1.0,Misc\n")
+    assert run_incremental().output_path.read_text() == full.output_path.read_text()
+
+def test_incremental_report_keeps_total_spend_without_new_clean_rows(tmpdir):
+    input_path = Path(tmpdir) / "growing.csv"
+    output_path = Path(tmpdir) / "incremental" / "out.csv"
+    input_path.write_text(QUOTED_HEADER + QUOTED_ROWS * 3)
+
+    def report_total():
+        pipeline = FinancialPipeline(input_path=str(input_path), output_path=str(output_path), incremental=True)
+        pipeline.run()
+        return next(line for line in pipeline.report_path.read_text().splitlines() if line.startswith("Total Spend"))
+
+    first = report_total()
+    assert first != "Total Spend: $0.00"
+    assert report_total() == first
+    with open(input_path, "a") as f:
+        f.write("bad date,STARBUCKS,$3.00\n")
+    assert report_total() == first
+
+def test_incremental_run_takes_complete_last_line_without_newline(tmpdir, capsys):
+    input_path = Path(tmpdir) / "growing.csv"
+    output_path = Path(tmpdir) / "incremental" / "out.csv"
+
+    def run_incremental():
+        pipeline = FinancialPipeline(input_path=str(input_path), output_path=str(output_path), incremental=True)
+        pipeline.run()
+        return pipeline
+
+    input_path.write_text(QUOTED_HEADER + QUOTED_ROWS + '2025-02-01,"Joe\'s, Inc.",$1.00')
+    assert run_incremental().stats["total_rows"] == 6
+
+    # A last line missing fields is still being written
+    with open(input_path, "a") as f:
+        f.write("\n" + QUOTED_ROWS + "2025-02-02,SHELL")
+    assert run_incremental().stats["total_rows"] == 11
+    assert "Holding back 16 bytes" in capsys.readouterr().out
+
+    with open(input_path, "a") as f:
+        f.write(" OIL,$2.00\n")
+    incremental = run_incremental()
+    full = FinancialPipeline(input_path=str(input_path), output_path=str(Path(tmpdir) / "full" / "out.csv"))
+    full.run()
+    assert incremental.stats["total_rows"] == full.stats["total_rows"] == 12
+    assert incremental.output_path.read_text() == full.output_path.read_text()
+
+def test_incremental_run_rebuilds_on_rewrite_or_config_change(tmpdir, monkeypatch, capsys):
+    from src.normalization import categories
+
+    input_path = Path(tmpdir) / "growing.csv"
+    output_path = Path(tmpdir) / "out" / "out.csv"
+    keywords_path = Path(tmpdir) / "keywords.csv"
+    keywords_path.write_text(categories.KEYWORDS_FILE.read_text())
+    monkeypatch.setattr(categories, "KEYWORDS_FILE", keywords_path)
+
+    def run_incremental():
+        pipeline = FinancialPipeline(input_path=str(input_path), output_path=str(output_path), incremental=True)
+        pipeline.run()
+        return capsys.readouterr().out
+
+    input_path.write_text(QUOTED_HEADER + QUOTED_ROWS * 3)
+    run_incremental()
+    assert "Resuming after 15 rows" in run_incremental()
+
+    input_path.write_text(QUOTED_HEADER + QUOTED_ROWS.replace("SHELL", "EXXON") * 4)
+    assert "input file was rewritten" in run_incremental()
+
+    with open(keywords_path, "a") as f:
+        f.write("Gas,EXXON\n")
+    assert "config or options changed" in run_incremental()
+    assert len(pd.read_csv(output_path)) == 12
+
+def test_merchant_cache_persists_across_runs(tmpdir):
+    cache_path = str(Path(tmpdir) / "cache" / "merchants.sqlite")
+    plain = run_pipeline(tmpdir, "plain")
+    cold = run_pipeline(tmpdir, "cold", merchant_cache=cache_path)
+    warm = run_pipeline(tmpdir, "warm", merchant_cache=cache_path, workers=2, chunksize=20)
+
+    for pipeline in [cold, warm]:
+        assert pipeline.output_path.read_text() == plain.output_path.read_text()
+        assert pipeline.stats["top_category"] == plain.stats["top_category"]
+    assert cold.merchant_cache.hits == 0 and cold.merchant_cache.misses > 0
+    assert warm.merchant_cache.misses == 0 and warm.merchant_cache.hits > 0
+
+# Generous ceiling for `import main`; the CLI must not pull in pandas or the normalizers before a command runs
+MAIN_IMPORT_BUDGET_US = 150_000
+
+def imported_modules(statement):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            capture_output=True, text=True, check=True, cwd=Path(__file__).resolve().parents[1])
+    timings = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            _, cumulative, name = line.split("|")
+            timings[name.strip()] = int(cumulative)
+    return timings
+
+def test_import_time_budget():
+    main_imports = imported_modules("import main")
+    assert main_imports["main"] < MAIN_IMPORT_BUDGET_US
+    assert not {"pandas", "numpy", "src.pipeline"} & set(main_imports)
+
+    # pandas already brings in dateutil, so rapidfuzz is the import the pipeline itself can defer
+    pipeline_imports = imported_modules("import src.pipeline")
+    assert "rapidfuzz" not in pipeline_imports
+
+def post_json(url, body):
+    request = urllib.request.Request(url, data=json.dumps(body).encode("utf-8"), method="POST",
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+def test_service_normalizes_rows_and_files(tmpdir):
+    service = NormalizationService()
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        rows = [
+            {"Transaction Date": "Feb 26, 2025", "Vendor": "UBER *TRIP", "Amount": "$12.50"},
+            {"Transaction Date": "Not a date", "Vendor": "AMZN", "Amount": 3},
+        ]
+        status, body = post_json(f"{url}/normalize", {"rows": rows})
+        assert status == 200
+        assert body["rows"] == [{"Date": "2025-02-26", "Merchant": "UBER", "Amount": 12.5, "Category": "Transport"}]
+        assert body["errors"][0]["Error_Reason"] == "Invalid Date Format: 'Not a date'"
+
+        # A file request returns the same rows as a batch run over that file
+        status, body = post_json(f"{url}/normalize", {"path": str(INPUT_FILE)})
+        expected = pd.read_csv(EXPECTED_FILE)
+        assert status == 200 and len(body["rows"]) == len(expected)
+        pd.testing.assert_frame_equal(pd.DataFrame(body["rows"]), expected, check_dtype=False)
+
+        assert post_json(f"{url}/reload", {}) == (200, {"status": "reloaded"})
+        assert all(cache["size"] == 0 for cache in service.health()["caches"].values())
+        assert post_json(f"{url}/normalize", {"path": str(Path(tmpdir) / "missing.csv")})[0] == 404
+        assert post_json(f"{url}/normalize", {"rows": "nope"})[0] == 400
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_in_memory_api_matches_file_run(tmpdir, capsys):
+    raw_df = pd.read_csv(INPUT_FILE, dtype=str)
+    clean_df, error_df, report = normalize(raw_df)
+
+    assert capsys.readouterr().out == ""
+    pd.testing.assert_frame_equal(render_csv_frame(clean_df).reset_index(drop=True), pd.read_csv(EXPECTED_FILE), check_dtype=False)
+    assert report["total_rows"] == len(raw_df)
+    assert (report["success_rows"], report["failed_rows"]) == (len(clean_df), len(error_df))
+    assert report["total_spend"] == pytest.approx(sum(report["category_spend"].values()))
+    assert not list(Path(tmpdir).iterdir())
+
+    # Chunked normalization on a reused pipeline returns the same frames and accumulates the report
+    pipeline = FinancialPipeline(chunksize=7, verbose=False)
+    chunked_clean, chunked_errors, _ = pipeline.normalize(raw_df)
+    pd.testing.assert_frame_equal(render_csv_frame(chunked_clean), render_csv_frame(clean_df))
+    pd.testing.assert_frame_equal(chunked_errors, error_df)
+    assert pipeline.normalize(raw_df)[2]["total_rows"] == 2 * len(raw_df)
+
+    with pytest.raises(ValueError, match="Could not automatically identify"):
+        normalize(pd.DataFrame({"foo": ["1"]}))
+
+def test_in_memory_api_accepts_duplicate_index_labels():
+    raw_df = pd.read_csv(INPUT_FILE, dtype=str)
+    clean_df, error_df, _ = normalize(raw_df)
+    doubled = pd.concat([raw_df, raw_df])
+    doubled_clean, doubled_errors, report = normalize(doubled)
+
+    assert report["total_rows"] == len(doubled)
+    assert (len(doubled_clean), len(doubled_errors)) == (2 * len(clean_df), 2 * len(error_df))
+    # The caller's labels come back on both outputs
+    assert doubled_clean.index.tolist() == clean_df.index.tolist() * 2
+    assert doubled_errors.index.tolist() == error_df.index.tolist() * 2
+    pd.testing.assert_frame_equal(render_csv_frame(doubled_clean), render_csv_frame(pd.concat([clean_df, clean_df])))
+
+def test_setup_failure_raises_instead_of_exiting(tmpdir):
+    pipeline = FinancialPipeline(input_path=str(Path(tmpdir) / "missing.csv"), output_path=str(Path(tmpdir) / "out.csv"))
+    with pytest.raises(PipelineError, match="Input file not found"):
+        pipeline.run()
+
+def test_metrics_cover_stages_and_paths(tmpdir):
+    serial = run_pipeline(tmpdir, "serial")
+    metrics = json.loads(serial.metrics_path.read_text())
+
+    stages = metrics["stages"]
+    assert {"load", "map_columns", "date", "amount", "merchant", "category", "write", "report"} <= set(stages)
+    assert stages["load"]["rows"] == stages["date"]["rows"] == metrics["rows"] == serial.stats["total_rows"]
+    assert stages["merchant"]["rows"] == serial.stats["success_rows"]
+
+    # Each distinct value that missed the memo went down exactly one normalizer path
+    caches = metrics["caches"]
+    for column in ["date", "amount", "merchant", "category"]:
+        paths = sum(n for path, n in metrics["paths"].items() if path.startswith(column + "."))
+        assert paths == caches[column]["misses"]
+
+    # Workers send their stage timings back to the parent
+    pooled = run_pipeline(tmpdir, "pooled", workers=2, chunksize=20)
+    pooled_stages = json.loads(pooled.metrics_path.read_text())["stages"]
+    assert pooled_stages["date"]["rows"] == stages["date"]["rows"]
+    assert pooled_stages["merchant"]["calls"] == -(-serial.stats["total_rows"] // 20)
+
+def test_benchmark_compare_flags_regressions():
+    baseline = {
+        "pipeline/10k": {"rows_per_sec": 1000.0, "peak_rss_mb": 100.0,
+                         "stages": {"merchant": {"seconds": 1.0, "rows_per_sec": 500.0},
+                                    "report": {"seconds": 0.001, "rows_per_sec": None}}},
+        "parse_date[series]": {"rows_per_sec": 1000.0, "peak_rss_mb": 100.0},
+    }
+    within = {
+        "pipeline/10k": {"rows_per_sec": 950.0, "peak_rss_mb": 105.0,
+                         "stages": {"merchant": {"seconds": 1.0, "rows_per_sec": 460.0},
+                                    "report": {"seconds": 0.5, "rows_per_sec": None}}},
+        "new_case": {"rows_per_sec": 1.0, "peak_rss_mb": 1.0},
+    }
+    assert benchmark_suite.compare(within, baseline, threshold=0.1) == []
+
+    slower = {
+        "pipeline/10k": {"rows_per_sec": 850.0, "peak_rss_mb": 100.0,
+                         "stages": {"merchant": {"seconds": 1.5, "rows_per_sec": 400.0}}},
+        "parse_date[series]": {"rows_per_sec": 1000.0, "peak_rss_mb": 125.0},
+    }
+    regressions = benchmark_suite.compare(slower, baseline, threshold=0.1)
+    assert len(regressions) == 3
+    assert benchmark_suite.compare(slower, baseline, threshold=0.3) == []
+
+def test_benchmark_dataset_is_seeded(tmpdir):
+    first, second = Path(tmpdir) / "a.csv", Path(tmpdir) / "b.csv"
+    benchmark_suite.generate_dataset(500, 50, 0.2, first)
+    benchmark_suite.generate_dataset(500, 50, 0.2, second)
+    assert first.read_bytes() == second.read_bytes()
+
+    df = pd.read_csv(first, dtype=str, keep_default_na=False)
+    assert len(df) == 500 and df["Description"].nunique() <= 50
+    assert 0 < (df["Amount"] == "N/A").sum() + (df["Transaction Date"] == "Not a date").sum() < 100
+
+def test_chaos_generator_default_matches_fixture(tmpdir):
+    output = Path(tmpdir) / "generated.csv"
+    generate_chaos.create_chaos_file(output)
+    # The fixture is stored with LF line endings; the csv module writes CRLF
+    assert output.read_bytes().replace(b"\r\n", b"\n") == INPUT_FILE.read_bytes()
+
+def test_chaos_generator_blocks_are_seeded_independently_of_workers(tmpdir):
+    pytest.importorskip("pyarrow")
+    options = generate_chaos.default_options(merchants=200, skew=1.1, date_formats="iso=3,long=1", error_rate=0.1)
+    serial, parallel = Path(tmpdir) / "serial.csv.gz", Path(tmpdir) / "parallel.parquet"
+    generate_chaos.create_chaos_file(serial, 1000, options=options, edge_cases=False, block_rows=300)
+    generate_chaos.create_chaos_file(parallel, 1000, options=options, edge_cases=False, block_rows=300, workers=2)
+
+    df = pd.read_csv(serial, dtype=str, keep_default_na=False)
+    pd.testing.assert_frame_equal(df, pd.read_parquet(parallel), check_dtype=False)
+    assert len(df) == 1000
+    assert df["Trans Date"].isin(generate_chaos.ERROR_VALUES["Trans Date"]).any()
+    assert df["Value"].isin(generate_chaos.ERROR_VALUES["Value"]).any()
+
+def make_batch_inputs(tmpdir):
+    batch_dir = Path(tmpdir) / "inbox"
+    batch_dir.mkdir()
+    raw = pd.read_csv(INPUT_FILE, dtype=str, keep_default_na=False)
+    raw.to_csv(batch_dir / "a_bank.csv", index=False)
+    # A second bank: its own header names, an extra column and gzip
+    raw.rename(columns={"Trans Date": "Posted Date", "Description": "Payee", "Value": "Amount"}) \
+        .assign(Memo="card")[["Memo", "Posted Date", "Payee", "Amount"]].to_csv(batch_dir / "b_bank.csv.gz", index=False)
+    raw.head(0).to_csv(batch_dir / "c_empty.csv", index=False)
+    (batch_dir / "notes.txt").write_text("not an export")
+    return batch_dir, raw
+
+def test_batch_input_combines_files_with_source_column(tmpdir):
+    batch_dir, raw = make_batch_inputs(tmpdir)
+    single = run_pipeline(tmpdir, "single")
+    batch = FinancialPipeline(input_path=str(batch_dir), output_path=str(Path(tmpdir) / "batch" / "normalized.csv"))
+    batch.run()
+
+    output = pd.read_csv(batch.output_path)
+    expected = pd.read_csv(single.output_path)
+    assert list(output.columns) == ["Date", "Merchant", "Amount", "Category", "Source_File"]
+    for name in ["a_bank.csv", "b_bank.csv.gz"]:
+        rows = output[output["Source_File"] == str(batch_dir / name)].drop(columns="Source_File")
+        pd.testing.assert_frame_equal(rows.reset_index(drop=True), expected)
+
+    errors = pd.read_csv(batch.error_path, dtype=str, keep_default_na=False)
+    assert list(errors.columns) == ["Source_File", "Trans Date", "Description", "Value", "Memo", "Posted Date", "Payee", "Amount",
+                                    "Error_Code", "Error_Column", "Error_Reason"]
+    assert set(errors.loc[errors["Source_File"].str.endswith("b_bank.csv.gz"), "Error_Column"]) <= {"Posted Date", "Amount"}
+    assert len(errors) == 2 * single.stats["failed_rows"]
+    assert (errors.loc[errors["Source_File"].str.endswith("b_bank.csv.gz"), "Memo"] == "card").all()
+
+    assert batch.stats["total_rows"] == 2 * len(raw)
+    assert list(batch.file_stats) == [str(batch_dir / name) for name in ["a_bank.csv", "b_bank.csv.gz", "c_empty.csv"]]
+    assert batch.file_stats[str(batch_dir / "c_empty.csv")]["total_rows"] == 0
+    assert batch.file_stats[str(batch_dir / "a_bank.csv")]["total_spend"] == single.stats["total_spend"]
+    assert "Input Files: 3" in batch.report_path.read_text()
+
+def test_file_with_glob_characters_is_a_single_input(tmpdir):
+    input_path = Path(tmpdir) / "stmt[1].csv"
+    copyfile(INPUT_FILE, input_path)
+    pipeline = FinancialPipeline(input_path=str(input_path), output_path=str(Path(tmpdir) / "out" / "normalized.csv"))
+    pipeline.run()
+
+    assert not pipeline.batch
+    assert pipeline.output_path.read_text() == run_pipeline(tmpdir, "plain").output_path.read_text()
+
+def test_worker_pool_does_not_fork_the_threaded_parent():
+    # Reader and writer threads can be running when the pool starts, so workers come from a fresh process
+    with FinancialPipeline(workers=2, verbose=False).process_pool() as executor:
+        assert executor._mp_context.get_start_method() in ("forkserver", "spawn")
+
+def test_batch_grouping_and_pool_do_not_change_output(tmpdir, monkeypatch):
+    batch_dir, _ = make_batch_inputs(tmpdir)
+    for number in range(3):
+        copyfile(INPUT_FILE, batch_dir / f"d_copy_{number}.csv")
+    pattern = str(batch_dir / "*.csv*")
+
+    grouped = FinancialPipeline(input_path=pattern, output_path=str(Path(tmpdir) / "grouped" / "normalized.csv"))
+    grouped.run()
+    monkeypatch.setattr("src.pipeline.BATCH_CHUNK_ROWS", 50)
+    for name, options in [("split", {}), ("pooled", {"workers": 2})]:
+        pipeline = FinancialPipeline(input_path=pattern, output_path=str(Path(tmpdir) / name / "normalized.csv"), **options)
+        pipeline.run()
+        assert pipeline.output_path.read_text() == grouped.output_path.read_text()
+        assert pipeline.error_path.read_text() == grouped.error_path.read_text()
+        assert pipeline.file_stats == grouped.file_stats
+
+def test_batch_input_rejects_single_file_options(tmpdir):
+    with pytest.raises(ValueError):
+        FinancialPipeline(input_path=str(tmpdir), output_path=str(Path(tmpdir) / "out.csv"), chunksize=10)
+    with pytest.raises(PipelineError):
+        FinancialPipeline(input_path=str(Path(tmpdir) / "*.csv"), output_path=str(Path(tmpdir) / "out.csv")).run()